@@ -0,0 +1,117 @@
+import copy
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+from foodgram.db.router import use_primary
+
+from .cache import bump_version, get_version
+from .metrics import AUTH_TOKEN_CACHE
+
+
+def token_version_name(key):
+    return f"auth-token:{sha256(key.encode()).hexdigest()}"
+
+
+def shared_cache_key(key, version):
+    return f"{token_version_name(key)}:{version}"
+
+
+class TokenCache:
+    """LRU токенов и их пользователей с ограниченным временем жизни."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key, version):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            expires, cached_version, user, token = item
+            if expires < time.monotonic() or cached_version != version:
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return user, token
+
+    def set(self, key, version, user, token):
+        with self.lock:
+            self.items[key] = (
+                time.monotonic() + self.ttl,
+                version,
+                user,
+                token,
+            )
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+token_cache = TokenCache(
+    settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TIMEOUT
+)
+
+
+def invalidate_tokens(keys):
+    """Сброс токенов во всех процессах после фиксации транзакции."""
+    keys = list(keys)
+
+    def bump():
+        for key in keys:
+            bump_version(token_version_name(key))
+
+    transaction.on_commit(bump)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без обращения к БД на каждый запрос.
+
+    Пользователь по токену ищется в LRU процесса, затем при
+    AUTH_TOKEN_SHARED_CACHE в общем кэше Django и только потом в БД.
+    Записи действительны, пока не сменилась версия токена в общем
+    кэше: удаление токена и изменение пользователя поднимают ее при
+    фиксации транзакции, и все процессы сразу идут в БД.
+    """
+
+    def authenticate_credentials(self, key):
+        # Версия читается до БД: изменение, зафиксированное после
+        # чтения пользователя, поднимет ее и сбросит запись.
+        version = get_version(token_version_name(key))
+        cached = token_cache.get(key, version)
+        if cached is not None:
+            AUTH_TOKEN_CACHE.labels("hit").inc()
+        elif settings.AUTH_TOKEN_SHARED_CACHE and (
+            cached := cache.get(shared_cache_key(key, version))
+        ):
+            AUTH_TOKEN_CACHE.labels("shared_hit").inc()
+            token_cache.set(key, version, *cached)
+        else:
+            AUTH_TOKEN_CACHE.labels("miss").inc()
+            # Кэшируется, поэтому читается с основной БД: новый токен
+            # или изменения пользователя могли не дойти до реплик.
+            with use_primary():
+                cached = super().authenticate_credentials(key)
+            token_cache.set(key, version, *cached)
+            if settings.AUTH_TOKEN_SHARED_CACHE:
+                cache.set(
+                    shared_cache_key(key, version),
+                    cached,
+                    settings.AUTH_TOKEN_CACHE_TIMEOUT,
+                )
+        user, token = cached
+        # Копия, чтобы изменения в одном запросе не попали в кэш.
+        return copy.copy(user), token
@@ -0,0 +1,174 @@
+import time
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Value
+from rest_framework.response import Response
+
+from recipes.models import FavouriteRecipe, ShoppingList
+from users.models import Subscription
+
+SUBSCRIPTIONS, FAVOURITES, SHOPPING_CART = range(3)
+RECIPES_VERSION = "recipes"
+
+
+def get_version(name):
+    """Текущая версия именованного набора данных."""
+    key = f"version:{name}"
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """Сброс всех закэшированных данных с версией name."""
+    cache.set(f"version:{name}", time.time(), None)
+
+
+class UserRelations:
+    """Id авторов в подписках, рецептов в избранном и в корзине."""
+
+    __slots__ = ("subscriptions", "favourites", "shopping_cart")
+
+    def __init__(self, subscriptions=(), favourites=(), shopping_cart=()):
+        self.subscriptions = frozenset(subscriptions)
+        self.favourites = frozenset(favourites)
+        self.shopping_cart = frozenset(shopping_cart)
+
+    @classmethod
+    def load(cls, user):
+        """Загрузка всех связей пользователя одним запросом."""
+        rows = (
+            Subscription.objects.filter(user=user)
+            .order_by()
+            .values_list("author_id", Value(SUBSCRIPTIONS))
+            .union(
+                FavouriteRecipe.objects.filter(user=user)
+                .order_by()
+                .values_list("recipe_id", Value(FAVOURITES)),
+                ShoppingList.objects.filter(user=user)
+                .order_by()
+                .values_list("recipe_id", Value(SHOPPING_CART)),
+                all=True,
+            )
+        )
+        ids = ([], [], [])
+        for pk, kind in rows:
+            ids[kind].append(pk)
+        return cls(*ids)
+
+    def to_cache(self):
+        return tuple(sorted(getattr(self, name)) for name in self.__slots__)
+
+
+EMPTY_RELATIONS = UserRelations()
+
+
+def relations_version_name(user_id):
+    return f"relations:{user_id}"
+
+
+def get_user_relations(request):
+    """Связи текущего пользователя, одни на весь запрос."""
+    user = request.user
+    if user.is_anonymous:
+        return EMPTY_RELATIONS
+    request = getattr(request, "_request", request)
+    relations = getattr(request, "_user_relations", None)
+    if relations is not None:
+        return relations
+    timeout = settings.USER_RELATIONS_CACHE_TIMEOUT
+    # После записи в запросе кэш до фиксации транзакции еще старый.
+    if timeout and not getattr(request, "_user_relations_changed", False):
+        key = "relations:{}:{}".format(
+            user.pk, get_version(relations_version_name(user.pk))
+        )
+        cached = cache.get(key)
+        if cached is None:
+            relations = UserRelations.load(user)
+            cache.set(key, relations.to_cache(), timeout)
+        else:
+            relations = UserRelations(*cached)
+    else:
+        relations = UserRelations.load(user)
+    request._user_relations = relations
+    return relations
+
+
+def invalidate_user_relations(user_id):
+    """Сброс кэша связей пользователя после фиксации транзакции."""
+    transaction.on_commit(
+        lambda: bump_version(relations_version_name(user_id))
+    )
+
+
+def mark_relations_changed(request):
+    """Запрос, изменивший связи, дальше читает их из БД."""
+    request = getattr(request, "_request", request)
+    request._user_relations = None
+    request._user_relations_changed = True
+
+
+def overlay_user_flags(recipes, relations):
+    """Флаги текущего пользователя поверх общих данных рецептов."""
+    for recipe in recipes:
+        recipe["is_favorited"] = recipe["id"] in relations.favourites
+        recipe["is_in_shopping_cart"] = recipe["id"] in relations.shopping_cart
+        author = recipe["author"]
+        author["is_subscribed"] = author["id"] in relations.subscriptions
+    return recipes
+
+
+def overlay_response_flags(data, relations):
+    """Флаги пользователя в ответе со списком или одним рецептом."""
+    if isinstance(data, dict) and "results" in data:
+        overlay_user_flags(data["results"], relations)
+    else:
+        overlay_user_flags([data], relations)
+    return data
+
+
+class RecipesCacheMixin:
+    """Общий для всех пользователей кэш списка и деталей рецептов.
+
+    Ключ кэша содержит версию рецептов и параметры запроса, флаги
+    пользователя подставляются в ответ из его связей.
+    """
+
+    user_filters = ("is_favorited", "is_in_shopping_cart")
+
+    def get_cache_key(self, request):
+        params = request.query_params
+        if any(name in params for name in self.user_filters):
+            return None
+        query = urlencode(sorted(params.lists()), doseq=True)
+        digest = md5(
+            f"{request.get_host()}{request.path}?{query}".encode()
+        ).hexdigest()
+        return f"recipes:{get_version(RECIPES_VERSION)}:{digest}"
+
+    def get_cached_response(self, request, view, *args, **kwargs):
+        key = self.get_cache_key(request)
+        data = cache.get(key) if key else None
+        if data is None:
+            response = view(request, *args, **kwargs)
+            if key is None or response.status_code != 200:
+                return response
+            data = response.data
+            cache.set(key, data, settings.RECIPES_CACHE_TIMEOUT)
+        return Response(
+            overlay_response_flags(data, get_user_relations(request))
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
@@ -0,0 +1,135 @@
+from hashlib import md5
+
+from django.utils.http import (
+    http_date,
+    parse_etags,
+    parse_http_date_safe,
+    quote_etag,
+)
+from rest_framework import status
+from rest_framework.response import Response
+
+from foodgram.db.router import is_recent, use_primary
+from recipes.catalogs import get_catalog_version
+from recipes.models import Recipe
+
+from .cache import RECIPES_VERSION, get_version, relations_version_name
+
+
+def get_conditional_headers(validators):
+    """ETag и Last-Modified по версиям данных и ключу ответа."""
+    versions, key = validators
+    etag = quote_etag(md5(f"{key}:{versions}".encode()).hexdigest())
+    return etag, int(max(versions))
+
+
+def is_not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        return etag in parse_etags(if_none_match) or (
+            if_none_match.strip() == "*"
+        )
+    if_modified_since = parse_http_date_safe(
+        request.headers.get("If-Modified-Since", "")
+    )
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+def set_conditional_headers(response, etag, last_modified):
+    if response.status_code in (
+        status.HTTP_200_OK,
+        status.HTTP_304_NOT_MODIFIED,
+    ):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """ETag и Last-Modified для list и retrieve.
+
+    Валидаторы считаются по версиям данных без сериализации, при
+    совпадении If-None-Match ответ 304 отдается без выборки данных.
+    """
+
+    catalog_versions = ()
+    # Справочники с версией в БД, см. recipes.catalogs.
+    catalogs = ()
+
+    def get_versions(self, request):
+        """Версии данных ответа, они же отметки времени изменения."""
+        return [get_version(name) for name in self.catalog_versions] + [
+            get_catalog_version(name) for name in self.catalogs
+        ]
+
+    def get_list_validators(self, request):
+        return self.get_versions(request), request.get_full_path()
+
+    def get_object_validators(self, request):
+        return self.get_versions(request), request.path
+
+    def get_conditional_response(
+        self, request, validators, view, *args, **kwargs
+    ):
+        if validators is None:
+            return view(request, *args, **kwargs)
+        etag, last_modified = get_conditional_headers(validators)
+        if is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        elif is_recent(last_modified):
+            # Иначе ETag новой версии достался бы ответу с реплики,
+            # еще не получившей изменение, и закэшировался бы с ним.
+            with use_primary():
+                response = view(request, *args, **kwargs)
+        else:
+            response = view(request, *args, **kwargs)
+        return set_conditional_headers(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            request,
+            self.get_list_validators(request),
+            super().list,
+            *args,
+            **kwargs,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            request,
+            self.get_object_validators(request),
+            super().retrieve,
+            *args,
+            **kwargs,
+        )
+
+
+class RecipesConditionalGetMixin(ConditionalGetMixin):
+    """Условные запросы к рецептам с учетом связей пользователя."""
+
+    catalog_versions = (RECIPES_VERSION,)
+
+    def get_versions(self, request):
+        versions = super().get_versions(request)
+        if request.user.is_authenticated:
+            versions.append(
+                get_version(relations_version_name(request.user.pk))
+            )
+        return versions
+
+    def get_object_validators(self, request):
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            updated_at = (
+                Recipe.objects.filter(**{self.lookup_field: lookup})
+                .values_list("updated_at", flat=True)
+                .first()
+            )
+        except (TypeError, ValueError):
+            return None
+        if updated_at is None:
+            return None
+        # Версия рецептов меняется и с тегами, ингредиентами и автором.
+        versions = self.get_versions(request)
+        versions.append(updated_at.timestamp())
+        return versions, request.path
@@ -0,0 +1,54 @@
+import binascii
+from base64 import b64decode
+from hashlib import sha256
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+BASE64_CHUNK_SIZE = 4 * 64 * 1024
+
+
+class StreamingBase64ImageField(serializers.ImageField):
+    """Изображение в base64, декодируется частями во временный файл.
+
+    Имя файла - sha256 содержимого, одинаковые картинки получают
+    одинаковые имена.
+    """
+
+    default_error_messages = {
+        "invalid_base64": "Некорректные данные изображения в base64.",
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            return super().to_internal_value(data)
+        header, _, encoded = data.rpartition(";base64,")
+        content_type = header[5:] if header.startswith("data:") else ""
+        extension = content_type.partition("/")[2] or "jpg"
+        upload = TemporaryUploadedFile(
+            f"image.{extension}", content_type, len(encoded) * 3 // 4, None
+        )
+        digest = sha256()
+        try:
+            for start in range(0, len(encoded), BASE64_CHUNK_SIZE):
+                end = start + BASE64_CHUNK_SIZE
+                chunk = b64decode(encoded[start:end], validate=True)
+                digest.update(chunk)
+                upload.write(chunk)
+        except (binascii.Error, ValueError):
+            upload.close()
+            self.fail("invalid_base64")
+        upload.size = upload.tell()
+        upload.seek(0)
+        try:
+            image = super().to_internal_value(upload)
+        except (ValidationError, DjangoValidationError):
+            # Файл удаляется при закрытии, с ошибкой он больше не нужен.
+            upload.close()
+            raise
+        image.name = "{}.{}".format(
+            digest.hexdigest(), image.image.format.lower()
+        )
+        return image
@@ -1,14 +1,20 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
 from django_filters import FilterSet, rest_framework
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe, Tag
+from recipes.models import FavouriteRecipe, Recipe, ShoppingList, Tag
+from recipes.search import search_recipes
 
 User = get_user_model()
 
 
 class RecipesFilter(FilterSet):
-    """Фильтры для shoppinglist и favourites рецептов"""
+    """Фильтры рецептов.
+
+    Каждый фильтр добавляет коррелированный EXISTS к входящему queryset,
+    поэтому любые сочетания собираются в один запрос без JOIN и DISTINCT.
+    """
 
     is_favorited = rest_framework.filters.BooleanFilter(
         method='filter_favorited'
@@ -17,29 +23,57 @@ class RecipesFilter(FilterSet):
         method='filter_shopping_cart'
     )
     tags = rest_framework.filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
         queryset=Tag.objects.all(),
         to_field_name='slug',
+        method='filter_tags',
     )
+    search = rest_framework.filters.CharFilter(method='filter_search')
 
-    def filter_by_list(self, queryset, name, value, list_name):
+    def filter_by_list(self, queryset, value, model):
         if value and self.request.user.is_authenticated:
-            return Recipe.objects.filter(
-                id__in=getattr(self.request.user, list_name).values_list(
-                    'recipe_id'
+            return queryset.filter(
+                Exists(
+                    model.objects.filter(
+                        user=self.request.user, recipe=OuterRef('pk')
+                    )
                 )
             )
         return queryset
 
     def filter_favorited(self, queryset, name, value):
-        return self.filter_by_list(queryset, name, value, 'favourites')
+        return self.filter_by_list(queryset, value, FavouriteRecipe)
 
     def filter_shopping_cart(self, queryset, name, value):
-        return self.filter_by_list(queryset, name, value, 'shoppinglist')
+        return self.filter_by_list(queryset, value, ShoppingList)
+
+    def filter_tags(self, queryset, name, value):
+        # value - уже выбранные при валидации теги, пустой без параметра.
+        if not value:
+            return queryset
+        return queryset.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe=OuterRef('pk'), tag__in=[tag.pk for tag in value]
+                )
+            )
+        )
+
+    def filter_search(self, queryset, name, value):
+        # Результаты поиска упорядочены по релевантности.
+        value = value.strip()
+        if not value:
+            return queryset
+        return search_recipes(queryset, value)
 
     class Meta:
         model = Recipe
-        fields = ("author", "tags", "is_favorited", "is_in_shopping_cart")
+        fields = (
+            "author",
+            "tags",
+            "is_favorited",
+            "is_in_shopping_cart",
+            "search",
+        )
 
 
 class IngredientsFilter(SearchFilter):
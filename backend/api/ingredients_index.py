@@ -0,0 +1,71 @@
+from bisect import bisect_left
+from itertools import islice
+from threading import Lock
+
+from recipes.catalogs import INGREDIENTS_CATALOG, get_catalog_version
+from recipes.models import Ingredient
+
+
+class IngredientsIndex:
+    """Ингредиенты в памяти процесса, отсортированные по названию."""
+
+    def __init__(self, ingredients):
+        self.items = sorted(
+            (
+                {"id": pk, "name": name, "measurement_unit": unit}
+                for pk, name, unit in ingredients
+            ),
+            key=lambda item: (item["name"].lower(), item["id"]),
+        )
+        self.keys = [item["name"].lower() for item in self.items]
+
+    @classmethod
+    def build(cls):
+        return cls(
+            Ingredient.objects.values_list("id", "name", "measurement_unit")
+        )
+
+    def search(self, query, limit=None):
+        """Сначала названия, начинающиеся с query, затем содержащие его."""
+        query = query.strip().lower()
+        if not query:
+            return self.items[:limit]
+        start = end = bisect_left(self.keys, query)
+        while end < len(self.keys) and self.keys[end].startswith(query):
+            end += 1
+        found = self.items[start:end][:limit]
+        if limit is None or len(found) < limit:
+            found.extend(
+                islice(
+                    (
+                        item
+                        for index, (key, item) in enumerate(
+                            zip(self.keys, self.items)
+                        )
+                        if not start <= index < end and query in key
+                    ),
+                    None if limit is None else limit - len(found),
+                )
+            )
+        return found
+
+
+_index = None
+_index_version = None
+_index_lock = Lock()
+
+
+def get_ingredients_index():
+    """Индекс ингредиентов, перестраивается при смене версии.
+
+    Версия справочника читается из БД: изменения из других процессов
+    (админка, load) видны сразу, без общего кэша.
+    """
+    global _index, _index_version
+    version = get_catalog_version(INGREDIENTS_CATALOG)
+    if _index is None or _index_version != version:
+        with _index_lock:
+            if _index is None or _index_version != version:
+                _index = IngredientsIndex.build()
+                _index_version = version
+    return _index
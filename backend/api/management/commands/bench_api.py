@@ -0,0 +1,333 @@
+import json
+import platform
+import statistics
+import subprocess
+import threading
+import time
+from functools import partial
+from pathlib import Path
+from urllib.parse import urlencode
+
+import requests
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+
+from recipes.models import FavouriteRecipe, Ingredient, Recipe, Tag
+from users.models import User
+
+REGRESSION_THRESHOLD = 1.2
+
+
+def percentile(values, percent):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ("git", "rev-parse", "--short", "HEAD"),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class TestClientTransport:
+    """Запросы через тестовый клиент Django с подсчетом SQL-запросов."""
+
+    def __init__(self, token):
+        self.client = Client(HTTP_AUTHORIZATION=f"Token {token}")
+
+    def request(self, method, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method.lower())(url)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        return response.status_code, len(queries)
+
+
+class HttpTransport:
+    """Запросы к запущенному серверу, число SQL-запросов неизвестно."""
+
+    def __init__(self, token, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Token {token}"
+
+    def request(self, method, url):
+        response = self.session.request(method, self.base_url + url)
+        return response.status_code, None
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест эндпоинтов API: задержка p50/p95/p99, "
+        "SQL-запросы на запрос и пропускная способность при "
+        "одновременных запросах"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Одновременных клиентов при замере rps эндпоинтов чтения",
+        )
+        parser.add_argument(
+            "--base-url",
+            help="Адрес запущенного сервера, по умолчанию тестовый клиент",
+        )
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Очищать кэш перед каждым запросом",
+        )
+        parser.add_argument("--only", help="Подстрока имени эндпоинта")
+        parser.add_argument("--save", help="Сохранить результаты в JSON")
+        parser.add_argument(
+            "--compare", help="Сравнить с ранее сохраненным JSON"
+        )
+
+    def endpoints(self, user):
+        recipe = Recipe.objects.order_by("-favorites_count").first()
+        not_favorited = (
+            Recipe.objects.exclude(
+                pk__in=FavouriteRecipe.objects.filter(user=user).values(
+                    "recipe"
+                )
+            )
+            .order_by("pk")
+            .first()
+        )
+        author = User.objects.order_by("-subscribers_count").first()
+        tags = Tag.objects.values_list("slug", flat=True)[:2]
+        ingredient = Ingredient.objects.first()
+        if not_favorited is None or ingredient is None:
+            raise CommandError(
+                "Нет данных, выполните manage.py load и manage.py seed_bench"
+            )
+        tag_query = "&".join(f"tags={slug}" for slug in tags)
+        search_query = urlencode({"search": ingredient.name.split()[0]})
+        return (
+            ("users-list", "GET", "/api/users/"),
+            ("users-me", "GET", "/api/users/me/"),
+            ("users-detail", "GET", f"/api/users/{author.pk}/"),
+            (
+                "users-subscriptions",
+                "GET",
+                "/api/users/subscriptions/?recipes_limit=3",
+            ),
+            ("tags-list", "GET", "/api/tags/"),
+            ("ingredients-list", "GET", "/api/ingredients/"),
+            (
+                "ingredients-search",
+                "GET",
+                f"/api/ingredients/?name={ingredient.name[:2]}",
+            ),
+            ("recipes-list", "GET", "/api/recipes/"),
+            ("recipes-list-tags", "GET", f"/api/recipes/?{tag_query}"),
+            (
+                "recipes-list-author",
+                "GET",
+                f"/api/recipes/?author={author.pk}",
+            ),
+            ("recipes-favorited", "GET", "/api/recipes/?is_favorited=1"),
+            ("recipes-in-cart", "GET", "/api/recipes/?is_in_shopping_cart=1"),
+            ("recipes-search", "GET", f"/api/recipes/?{search_query}"),
+            ("recipes-detail", "GET", f"/api/recipes/{recipe.pk}/"),
+            ("recipes-feed", "GET", "/api/recipes/feed/"),
+            (
+                "recipes-shopping-cart-summary",
+                "GET",
+                "/api/recipes/shopping_cart_summary/",
+            ),
+            (
+                "recipes-download-shopping-cart",
+                "GET",
+                "/api/recipes/download_shopping_cart/",
+            ),
+            (
+                "recipes-favorite",
+                ("POST", "DELETE"),
+                f"/api/recipes/{not_favorited.pk}/favorite/",
+            ),
+        )
+
+    def handle(self, *args, **options):
+        user = (
+            User.objects.filter(subscribes__isnull=False)
+            .order_by("pk")
+            .first()
+        )
+        if user is None:
+            raise CommandError("Нет пользователей, выполните seed_bench")
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency: число больше нуля")
+        token, _ = Token.objects.get_or_create(user=user)
+        if options["base_url"]:
+            create_transport = partial(
+                HttpTransport, token.key, options["base_url"]
+            )
+        else:
+            create_transport = partial(TestClientTransport, token.key)
+        transport = create_transport()
+        with override_settings(ALLOWED_HOSTS=["*"]):
+            results = {}
+            for name, methods, url in self.endpoints(user):
+                if options["only"] and options["only"] not in name:
+                    continue
+                results[name] = self.measure(transport, methods, url, options)
+                # Запись одного рецепта параллельно мешала бы сама себе.
+                results[name]["rps"] = (
+                    self.throughput(create_transport, url, options)
+                    if methods == "GET"
+                    else None
+                )
+        self.report(results)
+        self.stdout.write(
+            f"rps - запросов в секунду от {options['concurrency']} "
+            "одновременных клиентов, только для чтения"
+        )
+        baseline = {
+            "commit": git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "recipes": Recipe.objects.count(),
+            "users": User.objects.count(),
+            "transport": "http" if options["base_url"] else "test-client",
+            "cold": options["cold"],
+            "concurrency": options["concurrency"],
+            "results": results,
+        }
+        if options["save"]:
+            Path(options["save"]).write_text(
+                json.dumps(baseline, ensure_ascii=False, indent=2)
+            )
+            self.stdout.write(f"Результаты сохранены в {options['save']}")
+        if options["compare"]:
+            self.compare(
+                json.loads(Path(options["compare"]).read_text()), results
+            )
+
+    def measure(self, transport, methods, url, options):
+        if isinstance(methods, str):
+            methods = (methods,)
+        timings = []
+        queries = []
+        statuses = set()
+        total = options["warmup"] + options["requests"]
+        for number in range(total):
+            for method in methods:
+                if options["cold"]:
+                    cache.clear()
+                start = time.perf_counter()
+                status, count = transport.request(method, url)
+                elapsed = time.perf_counter() - start
+                if number < options["warmup"]:
+                    continue
+                timings.append(elapsed * 1000)
+                statuses.add(status)
+                if count is not None:
+                    queries.append(count)
+        return {
+            "method": "/".join(methods),
+            "url": url,
+            "statuses": sorted(statuses),
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+            "queries": round(statistics.mean(queries), 2) if queries else None,
+        }
+
+    def throughput(self, create_transport, url, options):
+        """Запросов в секунду от --concurrency одновременных клиентов.
+
+        У каждого потока свой клиент и свое соединение с БД, первый
+        запрос каждого потока не замеряется.
+        """
+        concurrency = options["concurrency"]
+        started = []
+        # Время берется до того, как барьер отпустит потоки.
+        ready = threading.Barrier(
+            concurrency, action=lambda: started.append(time.perf_counter())
+        )
+
+        def client(number):
+            try:
+                try:
+                    transport = create_transport()
+                    transport.request("GET", url)
+                finally:
+                    ready.wait()
+                for _ in range(number, options["requests"], concurrency):
+                    if options["cold"]:
+                        cache.clear()
+                    transport.request("GET", url)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=client, args=(number,))
+            for number in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return round(
+            options["requests"] / (time.perf_counter() - started[0]), 1
+        )
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'Эндпоинт':34} {'p50':>8} {'p95':>8} {'p99':>8} "
+            f"{'SQL':>6} {'rps':>8}  статусы"
+        )
+        for name, result in results.items():
+            queries = result["queries"]
+            rps = result["rps"]
+            self.stdout.write(
+                f"{name:34} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} "
+                f"{result['p99_ms']:8.2f} "
+                f"{'-' if queries is None else queries:>6} "
+                f"{'-' if rps is None else rps:>8}  "
+                f"{','.join(map(str, result['statuses']))}"
+            )
+
+    def compare(self, baseline, results):
+        """Регрессия: p95 выросла больше чем на 20% или SQL-запросов больше."""
+        self.stdout.write(
+            f"Сравнение с {baseline.get('commit') or 'базовой линией'}"
+        )
+        regressions = 0
+        for name, old in baseline["results"].items():
+            if name not in results:
+                continue
+            new = results[name]
+            p95_ratio = new["p95_ms"] / max(old["p95_ms"], 1e-9)
+            more_queries = (
+                old["queries"] is not None
+                and new["queries"] is not None
+                and new["queries"] > old["queries"]
+            )
+            regression = p95_ratio > REGRESSION_THRESHOLD or more_queries
+            regressions += regression
+            line = (
+                f"{name:34} p95 {old['p95_ms']:8.2f} -> "
+                f"{new['p95_ms']:8.2f} ({p95_ratio - 1:+.0%}), "
+                f"SQL {old['queries']} -> {new['queries']}"
+            )
+            self.stdout.write(self.style.ERROR(line) if regression else line)
+        if regressions:
+            raise CommandError(f"Регрессий: {regressions}")
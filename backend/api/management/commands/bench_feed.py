@@ -0,0 +1,178 @@
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import override_settings
+
+from api.management.commands.bench_api import percentile
+from api.paginations import PageNumberPagination
+from recipes.feed import fan_out_recipe, get_feed
+from recipes.management.commands.seed_bench import IMAGE_NAME
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription, User
+
+USERNAME_PREFIX = "bench_feed_"
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнение рассылки рецепта по лентам подписчиков и чтения "
+        "из таблицы рецептов при разном числе подписчиков автора. "
+        "Данные создаются в транзакции и откатываются"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--followers",
+            default="10,100,1000,10000",
+            help="Числа подписчиков автора через запятую",
+        )
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=20,
+            help="Сколько рецептов публикует автор",
+        )
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            counts = sorted(
+                {int(count) for count in options["followers"].split(",")}
+            )
+        except ValueError:
+            raise CommandError("--followers: числа через запятую")
+        if not counts or counts[0] < 1:
+            raise CommandError("--followers: числа больше нуля")
+        # Читатель с самой большой лентой из уже существующих.
+        reader = (
+            User.objects.annotate(subscriptions=Count("subscribes"))
+            .order_by("-subscriptions", "pk")
+            .first()
+        )
+        if reader is None:
+            raise CommandError("Нет пользователей, выполните seed_bench")
+        self.page_size = PageNumberPagination.page_size
+        self.options = options
+        self.stdout.write(
+            f"База: {connection.vendor}, читатель {reader} "
+            f"с подписками: {reader.subscriptions}, "
+            f"рецептов у автора: {options['recipes']}"
+        )
+        self.stdout.write(
+            f"{'подписчиков':>11} {'стратегия':10} {'запись p50':>11} "
+            f"{'строк':>7} {'чтение p50':>11} {'p95':>8}"
+        )
+        with transaction.atomic():
+            followers = self.followers(reader, counts[-1])
+            for count in counts:
+                # Рассылка при записи и чтение: порог выше и ниже
+                # числа подписчиков.
+                for title, limit in (("запись", count), ("чтение", 0)):
+                    with transaction.atomic():
+                        self.measure(title, reader, followers[:count], limit)
+                        transaction.set_rollback(True)
+            self.stdout.write(
+                "Без таблицы лент, только чтение из рецептов: "
+                + self.format_reads(self.read_pulled_only(reader))
+            )
+            transaction.set_rollback(True)
+
+    def followers(self, reader, count):
+        """Читатель, существующие пользователи и новые при нехватке."""
+        pks = [reader.pk] + list(
+            User.objects.exclude(pk=reader.pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[: count - 1]
+        )
+        password = make_password(None)
+        created = User.objects.bulk_create(
+            [
+                User(
+                    username=f"{USERNAME_PREFIX}{number}",
+                    email=f"{USERNAME_PREFIX}{number}@example.com",
+                    first_name="Подписчик",
+                    last_name="Ленты",
+                    password=password,
+                )
+                for number in range(count - len(pks))
+            ],
+            batch_size=2000,
+        )
+        return pks + [user.pk for user in created]
+
+    def measure(self, title, reader, followers, limit):
+        author = User.objects.create(
+            username=f"{USERNAME_PREFIX}author",
+            email=f"{USERNAME_PREFIX}author@example.com",
+            first_name="Автор",
+            last_name="Ленты",
+            password=make_password(None),
+        )
+        Subscription.objects.bulk_create(
+            [Subscription(user_id=pk, author=author) for pk in followers],
+            batch_size=2000,
+        )
+        User.objects.filter(pk=author.pk).update(
+            subscribers_count=len(followers)
+        )
+        writes = []
+        with override_settings(FEED_FANOUT_LIMIT=limit):
+            for _ in range(self.options["recipes"]):
+                start = time.perf_counter()
+                # Без сигналов: рассылка вызывается напрямую, а не
+                # фоновой задачей.
+                (recipe,) = Recipe.objects.bulk_create(
+                    [
+                        Recipe(
+                            author=author,
+                            name="Рецепт ленты",
+                            text="Рецепт для замера ленты",
+                            cooking_time=10,
+                            image=IMAGE_NAME,
+                        )
+                    ]
+                )
+                fan_out_recipe(recipe.pk)
+                writes.append((time.perf_counter() - start) * 1000)
+        rows = FeedEntry.objects.filter(recipe__author=author).count()
+        reads = self.time_reads(
+            lambda: get_feed(reader, None, self.page_size + 1)
+        )
+        self.stdout.write(
+            f"{len(followers):11} {title:10} "
+            f"{statistics.median(writes):8.2f} мс "
+            f"{rows // self.options['recipes']:7} "
+            f"{self.format_reads(reads)}"
+        )
+
+    def read_pulled_only(self, reader):
+        recipes = (
+            Recipe.objects.filter(
+                author__in=Subscription.objects.filter(user=reader).values(
+                    "author"
+                )
+            )
+            .order_by("-pub_date", "-id")
+            .values_list("pub_date", "id")
+        )
+        return self.time_reads(lambda: list(recipes[: self.page_size + 1]))
+
+    def time_reads(self, read):
+        timings = []
+        for number in range(self.options["warmup"] + self.options["requests"]):
+            start = time.perf_counter()
+            read()
+            if number >= self.options["warmup"]:
+                timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def format_reads(self, timings):
+        return (
+            f"{statistics.median(timings):8.2f} мс "
+            f"{percentile(timings, 95):5.2f} мс"
+        )
@@ -0,0 +1,53 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.ingredients_index import IngredientsIndex
+from api.serializers import IngredientsSerializer
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = "Сравнение поиска ингредиентов через ORM и через индекс в памяти"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--limit", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list("name", flat=True))
+        if not names:
+            self.stderr.write("Нет ингредиентов, выполните manage.py load")
+            return
+        rng = random.Random(options["seed"])
+        queries = [
+            name[: rng.randint(1, 4)].lower()
+            for name in rng.choices(names, k=options["queries"])
+        ]
+
+        def orm(query):
+            return IngredientsSerializer(
+                Ingredient.objects.filter(name__istartswith=query), many=True
+            ).data
+
+        start = time.perf_counter()
+        index = IngredientsIndex.build()
+        build_time = time.perf_counter() - start
+
+        def indexed(query):
+            return index.search(query, options["limit"])
+
+        self.stdout.write(
+            f"Ингредиентов: {len(names)}, запросов: {len(queries)}, "
+            f"построение индекса: {build_time * 1000:.1f} мс"
+        )
+        for title, search in (("ORM", orm), ("Индекс", indexed)):
+            start = time.perf_counter()
+            for query in queries:
+                search(query)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{title:8} {elapsed / len(queries) * 1000:8.3f} мс/запрос"
+            )
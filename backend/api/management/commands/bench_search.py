@@ -0,0 +1,105 @@
+import random
+import statistics
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.management.commands.bench_api import percentile
+from api.paginations import PageNumberPagination
+from recipes.models import Ingredient, Recipe
+from recipes.search import search_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер поиска рецептов: страница результатов и их число, "
+        "как в /api/recipes/?search="
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--target",
+            type=float,
+            default=10,
+            help="Допустимая задержка p95 в миллисекундах",
+        )
+
+    def queries(self, rng):
+        """Частое, редкое и отсутствующее слово, ингредиент, опечатка."""
+        names = list(
+            Recipe.objects.order_by("?").values_list("name", flat=True)[:500]
+        )
+        if not names:
+            raise CommandError("Нет рецептов, выполните manage.py seed_bench")
+        words = Counter(
+            word.lower() for name in names for word in name.split()
+        )
+        common = words.most_common(1)[0][0]
+        rare = rng.choice(
+            [word for word, count in words.items() if count == 1]
+        )
+        ingredient = (
+            Ingredient.objects.filter(name__regex=r"^\w+$")
+            .order_by("pk")
+            .values_list("name", flat=True)
+            .first()
+        )
+        return {
+            "частое слово": common,
+            "редкое слово": rare,
+            "опечатка": rare[:-1] + ("а" if rare[-1] != "а" else "о"),
+            "ингредиент": ingredient or common,
+            "фраза": f"{common} {ingredient or rare}",
+            "нет совпадений": "zzzzzz",
+        }
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        page_size = PageNumberPagination.page_size
+        self.stdout.write(
+            f"Рецептов: {Recipe.objects.count()}, база: {connection.vendor}"
+        )
+        self.stdout.write(
+            f"{'Запрос':16} {'строка':24} {'найдено':>8} "
+            f"{'p50':>8} {'p95':>8} {'p99':>8}"
+        )
+        slow = 0
+        for title, text in self.queries(rng).items():
+            queryset = search_recipes(Recipe.objects.all(), text)
+            timings = []
+            for number in range(options["warmup"] + options["requests"]):
+                start = time.perf_counter()
+                list(queryset[:page_size])
+                found = queryset.count()
+                elapsed = time.perf_counter() - start
+                if number >= options["warmup"]:
+                    timings.append(elapsed * 1000)
+            p95 = percentile(timings, 95)
+            line = (
+                f"{title:16} {text[:24]:24} {found:8} "
+                f"{statistics.median(timings):8.2f} {p95:8.2f} "
+                f"{percentile(timings, 99):8.2f}"
+            )
+            if p95 > options["target"]:
+                slow += 1
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
+            if connection.vendor == "postgresql":
+                plan = queryset[:page_size].explain()
+                if "recipe_search_vector_idx" not in plan:
+                    self.stdout.write(
+                        self.style.WARNING("  GIN-индекс не используется")
+                    )
+        if slow:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Медленнее {options['target']} мс (p95): {slow}"
+                )
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("Все запросы укладываются"))
@@ -0,0 +1,187 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from api.management.commands.bench_api import Command as ApiBenchmark
+from api.management.commands.bench_api import percentile
+from users.models import User
+
+MODES = {
+    "wsgi": ("foodgram.wsgi",),
+    "asgi": (
+        "--worker-class",
+        "uvicorn.workers.UvicornWorker",
+        "foodgram.asgi:application",
+    ),
+}
+ENDPOINTS = (
+    "recipes-list",
+    "recipes-list-tags",
+    "recipes-detail",
+    "tags-list",
+    "ingredients-search",
+    "users-subscriptions",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнение пропускной способности gunicorn в режимах WSGI и ASGI "
+        "(uvicorn) под параллельной нагрузкой на эндпоинты чтения"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=32,
+            help="Число одновременных запросов",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=400,
+            help="Запросов на эндпоинт",
+        )
+        parser.add_argument("--port", type=int, default=10100)
+        parser.add_argument(
+            "--modes", default=",".join(MODES), help="wsgi, asgi или оба"
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Отключить кэш ответов и связей пользователя",
+        )
+
+    def handle(self, *args, **options):
+        modes = options["modes"].split(",")
+        if not set(modes).issubset(MODES):
+            raise CommandError(f"Режимы: {', '.join(MODES)}")
+        user = (
+            User.objects.filter(subscribes__isnull=False)
+            .order_by("pk")
+            .first()
+        )
+        if user is None:
+            raise CommandError("Нет пользователей, выполните seed_bench")
+        token, _ = Token.objects.get_or_create(user=user)
+        endpoints = [
+            (name, url)
+            for name, method, url in ApiBenchmark().endpoints(user)
+            if name in ENDPOINTS
+        ]
+        results = {}
+        for mode in modes:
+            with self.server(mode, options):
+                base_url = f"http://127.0.0.1:{options['port']}"
+                for name, url in endpoints:
+                    results[mode, name] = self.load(
+                        base_url + url, token.key, options
+                    )
+        self.report(modes, endpoints, results)
+
+    def server(self, mode, options):
+        env = dict(os.environ)
+        if options["no_cache"]:
+            env["RECIPES_CACHE_TIMEOUT"] = "0"
+            env["USER_RELATIONS_CACHE_TIMEOUT"] = "0"
+        process = subprocess.Popen(
+            (
+                sys.executable,
+                "-m",
+                "gunicorn",
+                "--workers",
+                str(options["workers"]),
+                "--bind",
+                f"127.0.0.1:{options['port']}",
+                "--log-level",
+                "warning",
+                *MODES[mode],
+            ),
+            cwd=settings.BASE_DIR,
+            env=env,
+        )
+        return RunningServer(process, options["port"])
+
+    def load(self, url, token, options):
+        local = threading.local()
+
+        def request(_):
+            session = getattr(local, "session", None)
+            if session is None:
+                session = local.session = requests.Session()
+                session.headers["Authorization"] = f"Token {token}"
+            start = time.perf_counter()
+            try:
+                ok = session.get(url).status_code == 200
+            except requests.RequestException:
+                ok = False
+            return time.perf_counter() - start, ok
+
+        with ThreadPoolExecutor(options["concurrency"]) as executor:
+            list(executor.map(request, range(options["concurrency"])))
+            start = time.perf_counter()
+            samples = list(executor.map(request, range(options["requests"])))
+            elapsed = time.perf_counter() - start
+        timings = [duration * 1000 for duration, _ in samples]
+        return {
+            "rps": len(samples) / elapsed,
+            "p50": percentile(timings, 50),
+            "p95": percentile(timings, 95),
+            "errors": sum(not ok for _, ok in samples),
+        }
+
+    def report(self, modes, endpoints, results):
+        self.stdout.write(
+            f"{'Эндпоинт':22} {'режим':6} {'rps':>8} {'p50':>8} "
+            f"{'p95':>8} {'ошибки':>7}"
+        )
+        for name, _ in endpoints:
+            for mode in modes:
+                result = results[mode, name]
+                self.stdout.write(
+                    f"{name:22} {mode:6} {result['rps']:8.1f} "
+                    f"{result['p50']:8.2f} {result['p95']:8.2f} "
+                    f"{result['errors']:7}"
+                )
+            if len(modes) == 2:
+                ratio = results["asgi", name]["rps"] / max(
+                    results["wsgi", name]["rps"], 1e-9
+                )
+                self.stdout.write(f"{'':22} asgi/wsgi: {ratio:.2f}")
+
+
+class RunningServer:
+    """Запущенный gunicorn, останавливается при выходе из with."""
+
+    def __init__(self, process, port, timeout=30):
+        self.process = process
+        self.port = port
+        self.timeout = timeout
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise CommandError("gunicorn не запустился")
+            try:
+                socket.create_connection(("127.0.0.1", self.port), 1).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.__exit__()
+        raise CommandError("gunicorn не открыл порт")
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait(self.timeout)
@@ -0,0 +1,214 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Exists, OuterRef, Prefetch
+
+from api.shopping_list import get_shopping_list
+from recipes.models import (
+    FavouriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredients,
+    Tag,
+)
+from users.models import User
+
+PAGE_SIZE = 6
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполнение горячих запросов проекта с EXPLAIN (ANALYZE, BUFFERS) "
+        "и поиск последовательных сканирований больших таблиц"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=1000,
+            help="Сканирование с фильтром меньших таблиц не проблема",
+        )
+        parser.add_argument(
+            "--max-full-scan",
+            type=int,
+            default=100000,
+            help="Полное сканирование меньших таблиц не проблема",
+        )
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Печатать планы целиком",
+        )
+
+    def hot_queries(self):
+        user = User.objects.order_by("-recipes_count").first()
+        fan = (
+            User.objects.annotate(count=Count("favourites"))
+            .order_by("-count")
+            .first()
+        )
+        recipe = Recipe.objects.order_by("-favorites_count").first()
+        tag = Tag.objects.first()
+        ingredient = Ingredient.objects.first()
+        if None in (user, fan, recipe, tag, ingredient):
+            raise CommandError(
+                "Нет данных, выполните manage.py load и manage.py seed_bench"
+            )
+        return (
+            ("Лента рецептов", Recipe.objects.all()[:PAGE_SIZE]),
+            (
+                "Рецепты автора",
+                Recipe.objects.filter(author=user)[:PAGE_SIZE],
+            ),
+            (
+                "Рецепты по тегу",
+                Recipe.objects.filter(
+                    Exists(
+                        Recipe.tags.through.objects.filter(
+                            recipe=OuterRef("pk"), tag=tag
+                        )
+                    )
+                )[:PAGE_SIZE],
+            ),
+            (
+                "Избранное пользователя",
+                Recipe.objects.filter(
+                    Exists(
+                        FavouriteRecipe.objects.filter(
+                            user=fan, recipe=OuterRef("pk")
+                        )
+                    )
+                )[:PAGE_SIZE],
+            ),
+            (
+                "Ингредиенты рецепта",
+                RecipeIngredients.objects.filter(recipe=recipe).select_related(
+                    "ingredient"
+                ),
+            ),
+            (
+                "Поиск ингредиента по началу названия",
+                Ingredient.objects.filter(
+                    name__istartswith=ingredient.name[:2]
+                ),
+            ),
+            ("Тег по slug", Tag.objects.filter(slug=tag.slug)),
+            (
+                "Подписки пользователя",
+                User.objects.filter(subscribers__user=fan)
+                .order_by(*User._meta.ordering)
+                .prefetch_related(
+                    Prefetch("recipes", Recipe.objects.all()[:3])
+                )[:PAGE_SIZE],
+            ),
+            ("Список покупок", get_shopping_list(fan)),
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor == "postgresql":
+            explain = self.explain_postgresql
+        elif connection.vendor == "sqlite":
+            explain = self.explain_sqlite
+        else:
+            raise CommandError(
+                f"EXPLAIN для {connection.vendor} не поддерживается"
+            )
+        problems = 0
+        for title, queryset in self.hot_queries():
+            problems += explain(title, queryset, options)
+        if problems:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Последовательных сканирований: {problems}"
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS("Все горячие запросы используют индексы")
+            )
+
+    def explain_postgresql(self, title, queryset, options):
+        result = json.loads(
+            queryset.explain(format="json", analyze=True, buffers=True)
+        )[0]
+        plan = result["Plan"]
+        seq_scans = [
+            node
+            for node in self.walk(plan)
+            if node["Node Type"] == "Seq Scan"
+            and self.is_problem(
+                node["Relation Name"], "Filter" in node, options
+            )
+        ]
+        self.stdout.write(
+            f"{title}: {result['Execution Time']:.2f} мс, буферы: "
+            f"{plan.get('Shared Hit Blocks', 0)} в кэше, "
+            f"{plan.get('Shared Read Blocks', 0)} с диска"
+        )
+        for node in seq_scans:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"  Seq Scan по {node['Relation Name']}: "
+                    f"{node['Actual Rows']} строк"
+                    + (
+                        f", отфильтровано {node['Rows Removed by Filter']}"
+                        if "Rows Removed by Filter" in node
+                        else ""
+                    )
+                    + (
+                        f", условие {node['Filter']}"
+                        if "Filter" in node
+                        else ""
+                    )
+                )
+            )
+        if options["verbose_plans"]:
+            self.stdout.write(queryset.explain(analyze=True, buffers=True))
+        return len(seq_scans)
+
+    def explain_sqlite(self, title, queryset, options):
+        plan = queryset.explain()
+        scans = [
+            line.strip()
+            for line in plan.splitlines()
+            if " SCAN " in f" {line.strip()} "
+            and "USING" not in line
+            and self.is_problem(
+                line.split("SCAN", 1)[1].split()[0], True, options
+            )
+        ]
+        self.stdout.write(title)
+        for line in scans:
+            self.stdout.write(self.style.WARNING(f"  {line}"))
+        if options["verbose_plans"]:
+            self.stdout.write(plan)
+        return len(scans)
+
+    def is_problem(self, table, filtered, options):
+        """Выборка части большой таблицы или полный проход огромной."""
+        rows = self.table_rows(table)
+        if filtered:
+            return rows >= options["min_rows"]
+        return rows >= options["max_full_scan"]
+
+    def walk(self, node):
+        yield node
+        for child in node.get("Plans", ()):
+            yield from self.walk(child)
+
+    def table_rows(self, table):
+        """Примерное число строк таблицы из статистики или COUNT."""
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE relname = %s",
+                    [table],
+                )
+                row = cursor.fetchone()
+                if row and row[0] >= 0:
+                    return row[0]
+            cursor.execute(f"SELECT COUNT(*) FROM {quote(table)}")
+            return cursor.fetchone()[0]
@@ -0,0 +1,115 @@
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+REQUESTS = Counter(
+    "foodgram_http_requests_total",
+    "Число запросов по представлениям",
+    ("view", "method", "status"),
+)
+LATENCY = Histogram(
+    "foodgram_http_request_duration_seconds",
+    "Время обработки запроса",
+    ("view",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+QUERIES = Histogram(
+    "foodgram_db_queries_per_request",
+    "Число SQL-запросов на один запрос к API",
+    ("view",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+QUERY_TIME = Counter(
+    "foodgram_db_query_duration_seconds_total",
+    "Суммарное время SQL-запросов",
+    ("view",),
+)
+
+DB_POOL_CONNECTIONS = Gauge(
+    "foodgram_db_pool_connections",
+    "Соединения пула процесса: idle - свободные, used - занятые",
+    ("alias", "state"),
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "foodgram_db_pool_wait_seconds",
+    "Ожидание соединения из пула",
+    ("alias",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5, 10),
+)
+DB_POOL_CONNECTS = Counter(
+    "foodgram_db_pool_connects_total",
+    "Новые соединения с БД, открытые пулом",
+    ("alias",),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "foodgram_db_pool_timeouts_total",
+    "Соединение из пула не получено за отведенное время",
+    ("alias",),
+)
+
+AUTH_TOKEN_CACHE = Counter(
+    "foodgram_auth_token_cache_total",
+    "Поиск пользователя по токену: hit, shared_hit или miss",
+    ("result",),
+)
+
+
+def view_name(request, view_func):
+    """Имя представления: для viewset - класс и действие."""
+    cls = getattr(view_func, "cls", None)
+    if cls is None:
+        return getattr(request.resolver_match, "view_name", "unknown")
+    action = getattr(view_func, "actions", {}).get(request.method.lower())
+    return f"{cls.__name__}.{action}" if action else cls.__name__
+
+
+class QueryCounter:
+    """Обертка connection.execute_wrapper: число и время SQL-запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+def observe(view, method, status, duration, queries):
+    REQUESTS.labels(view, method, status).inc()
+    LATENCY.labels(view).observe(duration)
+    QUERIES.labels(view).observe(queries.count)
+    QUERY_TIME.labels(view).inc(queries.duration)
+
+
+def render_metrics():
+    """Метрики в текстовом формате Prometheus.
+
+    При заданном PROMETHEUS_MULTIPROC_DIR значения собираются из файлов
+    всех воркеров gunicorn, иначе - только текущего процесса.
+    """
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,159 @@
+import random
+import time
+from contextlib import ExitStack
+from hashlib import sha256
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from foodgram.db.router import reset_read_database, set_read_database
+
+from .metrics import QueryCounter, observe, view_name
+
+
+class MetricsMiddleware:
+    """Задержка и SQL-запросы по каждому представлению API.
+
+    Работает и в асинхронном режиме, иначе Django выполнял бы
+    асинхронные представления под ASGI в отдельном потоке.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with self.wrap_connections(queries):
+            response = self.get_response(request)
+        self.observe(request, response, start, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = QueryCounter()
+        start = time.perf_counter()
+        # Асинхронный ORM выполняет запросы в потоке запроса, а соединения
+        # у каждого потока свои, поэтому обертки ставятся в нем же.
+        stack = await sync_to_async(self.wrap_connections)(queries)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.observe(request, response, start, queries)
+        return response
+
+    def wrap_connections(self, queries):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(queries))
+        return stack
+
+    def observe(self, request, response, start, queries):
+        view = getattr(request, "metrics_view", None)
+        if view is not None:
+            observe(
+                view,
+                request.method,
+                response.status_code,
+                time.perf_counter() - start,
+                queries,
+            )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = view_name(request, view_func)
+
+
+class ReplicaMiddleware:
+    """Чтение с реплики, после записи клиента - с основной БД.
+
+    Клиент узнается по заголовку Authorization и по cookie, которая
+    ставится после записи: DATABASE_REPLICA_PIN_SECONDS секунд его
+    запросы читают с основной БД и видят свои изменения.
+    """
+
+    sync_capable = True
+    async_capable = True
+    cookie_name = "db_primary"
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        key = self.get_pin_key(request)
+        pinned = key is not None and cache.get(key)
+        token = set_read_database(self.get_read_database(request, pinned))
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_read_database(token)
+        if self.is_write(request, response):
+            if key is not None:
+                cache.set(key, True, settings.DATABASE_REPLICA_PIN_SECONDS)
+            self.set_pin_cookie(response)
+        return response
+
+    async def __acall__(self, request):
+        key = self.get_pin_key(request)
+        pinned = key is not None and await cache.aget(key)
+        token = set_read_database(self.get_read_database(request, pinned))
+        try:
+            response = await self.get_response(request)
+        finally:
+            reset_read_database(token)
+        if self.is_write(request, response):
+            if key is not None:
+                await cache.aset(
+                    key, True, settings.DATABASE_REPLICA_PIN_SECONDS
+                )
+            self.set_pin_cookie(response)
+        return response
+
+    def get_pin_key(self, request):
+        authorization = request.headers.get("Authorization")
+        if not authorization:
+            return None
+        return f"replica-pin:{sha256(authorization.encode()).hexdigest()}"
+
+    def get_read_database(self, request, pinned):
+        if (
+            pinned
+            or request.method not in SAFE_METHODS
+            or self.cookie_name in request.COOKIES
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def is_write(self, request, response):
+        return (
+            request.method not in SAFE_METHODS and response.status_code < 400
+        )
+
+    def set_pin_cookie(self, response):
+        response.set_cookie(
+            self.cookie_name,
+            "1",
+            max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+            httponly=True,
+            samesite="Lax",
+        )
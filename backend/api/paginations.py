@@ -1,4 +1,14 @@
-from rest_framework.pagination import PageNumberPagination
+from datetime import datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination,
+)
+
+from recipes.models import Recipe
+from users.models import User
 
 
 class PageNumberPagination(PageNumberPagination):
@@ -7,3 +17,79 @@ class PageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = "limit"
     max_page_size = 20
+
+
+class RecipesCursorPagination(CursorPagination):
+    """Курсорная пагинация рецептов без COUNT и OFFSET."""
+
+    page_size = PageNumberPagination.page_size
+    page_size_query_param = PageNumberPagination.page_size_query_param
+    max_page_size = PageNumberPagination.max_page_size
+    ordering = (*Recipe._meta.ordering, "id")
+
+
+class SubscriptionsCursorPagination(RecipesCursorPagination):
+    """Курсорная пагинация подписок."""
+
+    ordering = (*User._meta.ordering, "id")
+
+
+class FeedCursorPagination(RecipesCursorPagination):
+    """Пагинация ленты по ключу: дата публикации и id рецепта.
+
+    Страница - пары (pub_date, id) от функции feed(position, limit),
+    курсор хранит пару последнего рецепта. Лента листается только
+    вперед, ссылки previous нет.
+    """
+
+    def paginate_queryset(self, feed, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        position = None if cursor is None else self.parse(cursor.position)
+        rows = feed(position, self.page_size + 1)
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def parse(self, position):
+        try:
+            pub_date, pk = position.split(" ")
+            return datetime.fromisoformat(pub_date), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        pub_date, pk = self.page[-1]
+        return self.encode_cursor(
+            Cursor(
+                offset=0,
+                reverse=False,
+                position=f"{pub_date.isoformat()} {pk}",
+            )
+        )
+
+    def get_previous_link(self):
+        return None
+
+
+class CursorPaginationMixin:
+    """Курсорная пагинация по запросу клиента: ?pagination=cursor."""
+
+    cursor_pagination_class = None
+
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        return self.cursor_pagination_class is not None and (
+            params.get("pagination") == "cursor"
+            or self.cursor_pagination_class.cursor_query_param in params
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator") and self.use_cursor_pagination():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
@@ -1,10 +1,14 @@
+from collections import Counter
+
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
 from rest_framework import serializers
-from rest_framework.generics import get_object_or_404
 
+from recipes.cart import add_recipe_to_totals, subtract_recipe_from_totals
+from recipes.images import image_variant_urls
 from recipes.models import (
+    CartIngredientTotal,
     FavouriteRecipe,
     Ingredient,
     Recipe,
@@ -14,19 +18,38 @@ from recipes.models import (
 )
 from users.models import Subscription
 
+from .cache import get_user_relations
+from .fields import StreamingBase64ImageField
+
 User = get_user_model()
 
 
+def get_recipes_limit(request):
+    """Проверка параметра recipes_limit из запроса."""
+    limit = request.query_params.get("recipes_limit")
+    if limit is None:
+        return None
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise serializers.ValidationError(
+            "Кол-во рецептов должен быть целым числом"
+        )
+    if limit < 0:
+        raise serializers.ValidationError(
+            "Кол-во рецептов не может быть отрицательным числом"
+        )
+    return limit
+
+
 class UserSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField(
         method_name="get_is_subscribed"
     )
 
     def get_is_subscribed(self, obj):
-        user = self.context["request"].user
-        if user.is_anonymous:
-            return False
-        return Subscription.objects.filter(user=user, author=obj).exists()
+        relations = get_user_relations(self.context["request"])
+        return obj.pk in relations.subscriptions
 
     class Meta:
         model = User
@@ -40,16 +63,32 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeInSubscriptionSerializer(serializers.ModelSerializer):
+class RecipeImagesMixin(serializers.Serializer):
+    """Ссылки на уменьшенные копии изображения рецепта."""
+
+    images = serializers.SerializerMethodField()
+
+    def get_images(self, recipe):
+        urls = image_variant_urls(recipe)
+        request = self.context.get("request")
+        if request is None:
+            return urls
+        return {
+            key: request.build_absolute_uri(url) for key, url in urls.items()
+        }
+
+
+class RecipeInSubscriptionSerializer(
+    RecipeImagesMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "images", "cooking_time")
         read_only_fields = ("id", "name", "image", "cooking_time")
 
 
 class SubscriptionSerializer(UserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -65,26 +104,11 @@ class SubscriptionSerializer(UserSerializer):
         )
 
     def get_recipes(self, obj):
-        request = self.context.get("request")
-        limit = request.GET.get("recipes_limit")
-        queryset = obj.recipes.all()
-        if limit is not None:
-            try:
-                limit = int(limit)
-                if limit >= 0:
-                    queryset = queryset[:limit]
-                else:
-                    raise serializers.ValidationError(
-                        "Кол-во рецептов не может быть отрицательным числом"
-                    )
-            except ValueError:
-                raise serializers.ValidationError(
-                    "Кол-во рецептов должен быть целым числом"
-                )
-        return RecipeInSubscriptionSerializer(queryset, many=True).data
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.all().count()
+        if hasattr(obj, "limited_recipes"):
+            recipes = obj.limited_recipes
+        else:
+            recipes = obj.recipes.all()[: self.context.get("recipes_limit")]
+        return RecipeInSubscriptionSerializer(recipes, many=True).data
 
 
 class CheckSubscriptionSerializer(serializers.ModelSerializer):
@@ -144,7 +168,7 @@ class IngredientsSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class RecipesReadSerializer(serializers.ModelSerializer):
+class RecipesReadSerializer(RecipeImagesMixin, serializers.ModelSerializer):
     """Сериализатор чтения рецептов."""
 
     tags = TagsSerializer(many=True)
@@ -155,49 +179,40 @@ class RecipesReadSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        exclude = ("pub_date",)
+        exclude = (
+            "pub_date",
+            "updated_at",
+            "image_variants",
+            "favorites_count",
+            "in_carts_count",
+            "search_vector",
+            "in_feeds",
+        )
 
     def get_is_favorited(self, recipe):
-        user = self.context["request"].user
-        return (
-            user.is_authenticated
-            and user.favourites.filter(recipe=recipe).exists()
-        )
+        relations = get_user_relations(self.context["request"])
+        return recipe.pk in relations.favourites
 
     def get_is_in_shopping_cart(self, recipe):
-        user = self.context["request"].user
-        return (
-            user.is_authenticated
-            and user.shoppinglist.filter(recipe=recipe).exists()
-        )
+        relations = get_user_relations(self.context["request"])
+        return recipe.pk in relations.shopping_cart
 
     def get_ingredients(self, obj):
-        ingredients_data = obj.ingredients.values(
-            "ingredient__id",
-            "ingredient__name",
-            "ingredient__measurement_unit",
-            "amount",
-        )
-        modified_ingredients = []
-
-        for ingredient_data in ingredients_data:
-            modified_ingredient = {
-                "id": ingredient_data["ingredient__id"],
-                "name": ingredient_data["ingredient__name"],
-                "measurement_unit": ingredient_data[
-                    "ingredient__measurement_unit"
-                ],
-                "amount": ingredient_data["amount"],
+        return [
+            {
+                "id": item.ingredient.id,
+                "name": item.ingredient.name,
+                "measurement_unit": item.ingredient.measurement_unit,
+                "amount": item.amount,
             }
-            modified_ingredients.append(modified_ingredient)
-
-        return modified_ingredients
+            for item in obj.ingredients.all()
+        ]
 
 
 class IngredientInRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор добавления ингредиентов в рецепт."""
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(validators=[MinValueValidator(1)])
 
     class Meta:
@@ -205,46 +220,65 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
+def validate_ids(ids, queryset, duplicate_message, missing_message):
+    """Проверка повторов и наличия id в базе одним запросом IN."""
+    duplicates = [pk for pk, count in Counter(ids).items() if count > 1]
+    missing = set(ids).difference(
+        queryset.filter(id__in=set(ids)).values_list("id", flat=True)
+    )
+    return [
+        message.format(", ".join(map(str, sorted(invalid_ids))))
+        for message, invalid_ids in (
+            (duplicate_message, duplicates),
+            (missing_message, missing),
+        )
+        if invalid_ids
+    ]
+
+
 class RecipesWriteSerializer(serializers.ModelSerializer):
     """Сериализатор записи рецептов."""
 
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all()
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     ingredients = IngredientInRecipeSerializer(many=True)
-    image = Base64ImageField()
+    image = StreamingBase64ImageField()
 
     class Meta:
         model = Recipe
-        exclude = ("pub_date",)
-        read_only_fields = ("author",)
-
-    def get_ingredients(self, obj):
-        ingredients_data = obj.ingredients.values(
-            "id",
-            "amount",
+        exclude = (
+            "pub_date",
+            "updated_at",
+            "image_variants",
+            "favorites_count",
+            "in_carts_count",
         )
-        return ingredients_data
+        read_only_fields = ("author",)
 
     def validate(self, data):
-        ingredients = self.initial_data["ingredients"]
-        ingredient_list = []
+        ingredients = data.get("ingredients")
         if not ingredients:
             raise serializers.ValidationError(
-                "Минимально должен быть 1 ингредиент."
+                {"ingredients": "Минимально должен быть 1 ингредиент."}
             )
-        for item in ingredients:
-            ingredient = get_object_or_404(Ingredient, id=item["id"])
-            if ingredient in ingredient_list:
-                raise serializers.ValidationError(
-                    "Ингредиент не должен повторяться."
-                )
-            if int(item.get("amount")) < 1:
-                raise serializers.ValidationError(
-                    "Минимальное количество ингридиентов >= 1"
-                )
-            ingredient_list.append(ingredient)
-        data["ingredients"] = ingredients
+        errors = {
+            "ingredients": validate_ids(
+                [item["id"] for item in ingredients],
+                Ingredient.objects.all(),
+                "Ингредиент не должен повторяться: {}",
+                "Ингредиенты не найдены: {}",
+            ),
+            "tags": validate_ids(
+                data.get("tags", []),
+                Tag.objects.all(),
+                "Теги не должны повторяться: {}",
+                "Теги не найдены: {}",
+            ),
+        }
+        errors = {
+            field: messages for field, messages in errors.items() if messages
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
         return data
 
     def validate_cooking_time(self, time):
@@ -268,6 +302,7 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
         )
         return instance
 
+    @transaction.atomic
     def create(self, validated_data):
         validated_data['author'] = self.context['request'].user
         validated_data['image'] = validated_data.pop('image')
@@ -278,21 +313,40 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
             recipe, ingredients=ingredients, tags=tags
         )
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
+        if "image" in validated_data:
+            validated_data["image_variants"] = {}
+        subtract_recipe_from_totals(instance.pk)
         RecipeIngredients.objects.filter(recipe=instance).delete()
         ingredients = validated_data.pop("ingredients")
         tags = validated_data.pop("tags")
         instance = self.add_ingredients_and_tags(
             instance, ingredients=ingredients, tags=tags
         )
+        add_recipe_to_totals(instance.pk)
         return super().update(instance, validated_data)
 
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            # Хранилище перемещает временный файл, закрываем его явно.
+            image = self.validated_data.get("image")
+            if image is not None:
+                image.close()
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+    def to_representation(self, instance):
+        return RecipesReadSerializer(
+            Recipe.objects.with_related().get(pk=instance.pk),
+            context=self.context,
+        ).data
+
+
+class ShortRecipeSerializer(RecipeImagesMixin, serializers.ModelSerializer):
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "images", "cooking_time")
         read_only_fields = ("id", "name", "image", "cooking_time")
 
 
@@ -344,3 +398,17 @@ class ShoppingCartSerializer(BaseFavoriteShoppingCartSerializer):
 
     def get_queryset(self, user):
         return user.shoppinglist
+
+
+class CartIngredientSerializer(serializers.ModelSerializer):
+    """Сериализатор ингредиента в корзине с общим количеством."""
+
+    id = serializers.ReadOnlyField(source="ingredient.id")
+    name = serializers.ReadOnlyField(source="ingredient.name")
+    measurement_unit = serializers.ReadOnlyField(
+        source="ingredient.measurement_unit"
+    )
+
+    class Meta:
+        model = CartIngredientTotal
+        fields = ("id", "name", "measurement_unit", "amount")
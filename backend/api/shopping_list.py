@@ -0,0 +1,100 @@
+import csv
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+
+from recipes.models import CartIngredientTotal
+
+PDF_CHUNK_SIZE = 64 * 1024
+PDF_FONT = "ShoppingListFont"
+
+logger = logging.getLogger(__name__)
+
+
+def get_shopping_list(user):
+    """Количество ингредиентов из корзины, суммы хранятся готовыми."""
+    return (
+        CartIngredientTotal.objects.filter(user=user)
+        .order_by("ingredient__name", "ingredient__measurement_unit")
+        .values_list(
+            "ingredient__name", "ingredient__measurement_unit", "amount"
+        )
+    )
+
+
+def render_txt(items):
+    yield settings.TITLE_SHOP_LIST
+    for name, measurement_unit, amount in items:
+        yield f"{name}, {amount} {measurement_unit}\n"
+
+
+class Echo:
+    """Буфер, который возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(("name", "amount", "measurement_unit"))
+    for name, measurement_unit, amount in items:
+        yield writer.writerow((name, amount, measurement_unit))
+
+
+def get_pdf_font():
+    """Шрифт с кириллицей из SHOPPING_LIST_PDF_FONT или Helvetica."""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    path = settings.SHOPPING_LIST_PDF_FONT
+    if not path:
+        return "Helvetica"
+    if not os.path.exists(path):
+        logger.warning("Нет шрифта %s, PDF без кириллицы", path)
+        return "Helvetica"
+    if PDF_FONT not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(PDF_FONT, path))
+    return PDF_FONT
+
+
+def render_pdf(items):
+    # Шрифт выбирается до начала потокового ответа: ошибка в генераторе
+    # оборвала бы уже отправляемый файл.
+    return generate_pdf(items, get_pdf_font())
+
+
+def generate_pdf(items, font):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    margin, line_height = 50, 18
+
+    def new_page():
+        text = pdf.beginText(margin, height - margin)
+        text.setFont(font, 12)
+        return text
+
+    text = new_page()
+    for line in render_txt(items):
+        text.textLine(line.rstrip("\n"))
+        if text.getY() < margin + line_height:
+            pdf.drawText(text)
+            pdf.showPage()
+            text = new_page()
+    pdf.drawText(text)
+    pdf.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(PDF_CHUNK_SIZE), b"")
+
+
+SHOPPING_LIST_FORMATS = {
+    "txt": (render_txt, "text/plain; charset=utf-8"),
+    "csv": (render_csv, "text/csv; charset=utf-8"),
+    "pdf": (render_pdf, "application/pdf"),
+}
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import FavouriteRecipe, ShoppingList
+from users.models import Subscription
+
+from .authentication import invalidate_tokens
+from .cache import invalidate_user_relations
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver((post_save, post_delete), sender=User)
+def user_changed(instance, **kwargs):
+    invalidate_tokens(
+        Token.objects.filter(user_id=instance.pk).values_list("key", flat=True)
+    )
+
+
+@receiver((post_save, post_delete), sender=Subscription)
+@receiver((post_save, post_delete), sender=FavouriteRecipe)
+@receiver((post_save, post_delete), sender=ShoppingList)
+def user_relation_changed(instance, **kwargs):
+    # И при записи не через API: в админке или каскадом при удалении.
+    invalidate_user_relations(instance.user_id)
@@ -0,0 +1,764 @@
+import time
+from base64 import b64encode
+from datetime import timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import authentication, fields
+from api.filters import RecipesFilter
+from api.paginations import PageNumberPagination
+from api.cache import RECIPES_VERSION, get_version
+from recipes.models import (
+    CartIngredientTotal,
+    CatalogVersion,
+    FavouriteRecipe,
+    FeedEntry,
+    Ingredient,
+    Recipe,
+    RecipeIngredients,
+    ShoppingList,
+    Tag,
+)
+from recipes.feed import get_feed
+from recipes.search import update_search_vectors
+from users.models import Subscription, User
+
+DUMMY_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+}
+
+
+class ApiTestCase(TestCase):
+    """Пользователь, автор, теги и ингредиенты для запросов к API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.create_user("reader")
+        cls.author = cls.create_user("author")
+        cls.tags = [
+            Tag.objects.create(name=name, color=color, slug=slug)
+            for name, color, slug in (
+                ("Завтрак", "#E26C2D", "breakfast"),
+                ("Обед", "#49B64E", "lunch"),
+            )
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit="г")
+            for name in ("соль", "сахар", "мука")
+        ]
+
+    @classmethod
+    def create_user(cls, username):
+        return User.objects.create_user(
+            username=username,
+            email=f"{username}@example.com",
+            password="password",
+            first_name="Имя",
+            last_name="Фамилия",
+        )
+
+    def setUp(self):
+        # Версии и ответы в кэше не переходят из теста в тест.
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipes(self, count, author=None):
+        recipes = []
+        for number in range(count):
+            recipe = Recipe.objects.create(
+                author=author or self.author,
+                name=f"Рецепт {number}",
+                text="Описание",
+                cooking_time=10,
+                image="image_recipe/test.jpg",
+            )
+            recipe.tags.set(self.tags[: number % 2 + 1])
+            RecipeIngredients.objects.bulk_create(
+                RecipeIngredients(
+                    recipe=recipe, ingredient=ingredient, amount=100
+                )
+                for ingredient in self.ingredients
+            )
+            recipes.append(recipe)
+        return recipes
+
+
+class RecipesListQueriesTest(ApiTestCase):
+    """Число запросов списка рецептов не зависит от числа рецептов."""
+
+    def assert_list_queries(self, url, queries, lists=()):
+        for count in (2, 4):
+            for recipe in self.create_recipes(count):
+                for model in lists:
+                    model.objects.create(user=self.user, recipe=recipe)
+            cache.clear()
+            with self.assertNumQueries(queries):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.data["results"])
+
+    def test_list(self):
+        self.assert_list_queries("/api/recipes/", 5)
+
+    def test_list_anonymous(self):
+        self.client.force_authenticate(None)
+        self.assert_list_queries("/api/recipes/", 4)
+
+    def test_filter_favorited(self):
+        self.assert_list_queries(
+            "/api/recipes/?is_favorited=1", 5, (FavouriteRecipe,)
+        )
+
+    def test_filter_shopping_cart(self):
+        self.assert_list_queries(
+            "/api/recipes/?is_in_shopping_cart=1", 5, (ShoppingList,)
+        )
+
+    def test_filter_tags(self):
+        # Еще один запрос - проверка слагов тегов.
+        self.assert_list_queries("/api/recipes/?tags=breakfast&tags=lunch", 6)
+
+    def test_filter_author(self):
+        # Еще один запрос - проверка автора.
+        self.assert_list_queries(f"/api/recipes/?author={self.author.pk}", 6)
+
+    def test_list_flags(self):
+        recipe, other = self.create_recipes(2)
+        FavouriteRecipe.objects.create(user=self.user, recipe=recipe)
+        ShoppingList.objects.create(user=self.user, recipe=other)
+        Subscription.objects.create(user=self.user, author=self.author)
+        results = {
+            item["id"]: item
+            for item in self.client.get("/api/recipes/").data["results"]
+        }
+        self.assertTrue(results[recipe.pk]["is_favorited"])
+        self.assertFalse(results[recipe.pk]["is_in_shopping_cart"])
+        self.assertTrue(results[other.pk]["is_in_shopping_cart"])
+        self.assertTrue(results[other.pk]["author"]["is_subscribed"])
+        self.assertEqual(len(results[recipe.pk]["ingredients"]), 3)
+
+
+@skipUnless(connection.vendor == "postgresql", "Планы запросов PostgreSQL")
+class QueryPlansTest(ApiTestCase):
+    """Горячие запросы читают рецепты, избранное и корзину по индексам.
+
+    На нескольких строках полное чтение и сортировка дешевле индекса,
+    поэтому они выключены: Seq Scan остается в плане, только если
+    подходящего индекса нет, а порядок страницы дает только индекс.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for recipe in self.create_recipes(3):
+            FavouriteRecipe.objects.create(user=self.user, recipe=recipe)
+            ShoppingList.objects.create(user=self.user, recipe=recipe)
+        Subscription.objects.create(user=self.user, author=self.author)
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+
+    def user_indexes(self, model):
+        """Индексы таблицы связей, начинающиеся с user_id."""
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, model._meta.db_table
+            )
+        return [
+            name
+            for name, info in constraints.items()
+            if (info["index"] or info["unique"])
+            and info["columns"][:1] == ["user_id"]
+        ]
+
+    def assert_plan(self, plan, *indexes, relation=None):
+        self.assertNotIn("Seq Scan", plan)
+        for name in indexes:
+            self.assertIn(f" {name} ", plan)
+        if relation is not None:
+            self.assertTrue(
+                any(
+                    f" {name} " in plan for name in self.user_indexes(relation)
+                ),
+                f"{relation._meta.db_table}.user_id без индекса:\n{plan}",
+            )
+
+    def filtered(self, **params):
+        request = SimpleNamespace(user=self.user)
+        queryset = RecipesFilter(params, Recipe.objects.all(), request=request)
+        return queryset.qs[: PageNumberPagination.page_size].explain()
+
+    def test_list(self):
+        self.assert_plan(self.filtered(), "recipe_pub_date_id_idx")
+
+    def test_author(self):
+        self.assert_plan(
+            self.filtered(author=self.author.pk), "recipe_author_pub_date_idx"
+        )
+
+    def test_favorited(self):
+        self.assert_plan(
+            self.filtered(is_favorited="1"),
+            "recipe_pub_date_id_idx",
+            relation=FavouriteRecipe,
+        )
+
+    def test_shopping_cart(self):
+        self.assert_plan(
+            self.filtered(is_in_shopping_cart="1"),
+            "recipe_pub_date_id_idx",
+            relation=ShoppingList,
+        )
+
+    def test_tags(self):
+        self.assert_plan(
+            self.filtered(tags=["breakfast", "lunch"]),
+            "recipe_pub_date_id_idx",
+        )
+
+    def test_cart_summary(self):
+        self.assert_plan(
+            CartIngredientTotal.objects.filter(user=self.user)
+            .select_related("ingredient")
+            .explain(),
+            relation=CartIngredientTotal,
+        )
+
+    def test_feed(self):
+        # Обе выборки ленты: из разосланных строк и из рецептов.
+        with CaptureQueriesContext(connection) as queries:
+            get_feed(self.user, None, PageNumberPagination.page_size + 1)
+        self.assertEqual(len(queries), 2)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                cursor.execute(f"EXPLAIN {query['sql']}")
+                plans.extend(row for row, in cursor.fetchall())
+        self.assert_plan("\n".join(plans), "feed_user_pub_date_idx")
+
+
+class RecipesSearchTest(ApiTestCase):
+    """Поиск ранжирует и считает все совпадения."""
+
+    def test_rank_all_matches(self):
+        best, *others = self.create_recipes(3)
+        Recipe.objects.filter(pk=best.pk).update(name="Тыква запеченная")
+        Recipe.objects.exclude(pk=best.pk).update(text="Тыква и соль")
+        update_search_vectors([best.pk, *(recipe.pk for recipe in others)])
+        response = self.client.get(
+            "/api/recipes/", {"search": "тыква", "limit": 1}
+        )
+        self.assertEqual(response.data["count"], 3)
+        # Самое старое совпадение, но по названию.
+        self.assertEqual(response.data["results"][0]["id"], best.pk)
+        response = self.client.get(
+            "/api/recipes/",
+            {"search": "тыква", "limit": 1, "pagination": "cursor"},
+        )
+        self.assertEqual(response.data["results"][0]["id"], best.pk)
+
+    def test_case_insensitive(self):
+        recipes = self.create_recipes(2)
+        update_search_vectors([recipe.pk for recipe in recipes])
+        for text in ("СОЛЬ", "рецепт"):
+            with self.subTest(text=text):
+                response = self.client.get("/api/recipes/", {"search": text})
+                self.assertEqual(response.data["count"], 2)
+
+
+class CacheVersionsTest(ApiTestCase):
+    """Версии данных в кэше меняются только после фиксации транзакции."""
+
+    def assert_bumped_on_commit(self, name, change):
+        version = get_version(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+            self.assertEqual(get_version(name), version)
+        self.assertNotEqual(get_version(name), version)
+
+    def test_recipes(self):
+        self.assert_bumped_on_commit(
+            RECIPES_VERSION, lambda: self.create_recipes(1)
+        )
+
+    def test_ingredient(self):
+        ingredient = self.ingredients[0]
+        ingredient.name = "соль морская"
+        self.assert_bumped_on_commit(RECIPES_VERSION, ingredient.save)
+
+    def test_author(self):
+        self.author.first_name = "Автор"
+        self.assert_bumped_on_commit(RECIPES_VERSION, self.author.save)
+
+    def test_login_keeps_version(self):
+        version = get_version(RECIPES_VERSION)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save(update_fields=["last_login"])
+        self.assertEqual(get_version(RECIPES_VERSION), version)
+
+    def test_cached_list(self):
+        self.create_recipes(1)
+        etag = self.client.get("/api/recipes/")["ETag"]
+        ingredient = self.ingredients[0]
+        ingredient.name = "соль морская"
+        self.author.first_name = "Автор"
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.save()
+            self.author.save()
+        response = self.client.get("/api/recipes/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        (recipe,) = response.data["results"]
+        self.assertEqual(recipe["author"]["first_name"], "Автор")
+        self.assertIn(
+            "соль морская",
+            [item["name"] for item in recipe["ingredients"]],
+        )
+
+
+class IngredientsSearchTest(ApiTestCase):
+    """Индекс ингредиентов видит изменения из других процессов."""
+
+    def search(self, name):
+        response = self.client.get("/api/ingredients/", {"name": name})
+        return [item["name"] for item in response.data]
+
+    def test_change_in_other_process(self):
+        self.assertEqual(self.search("со"), ["соль"])
+        # Другой процесс со своим кэшем: версия в нашем кэше прежняя.
+        with self.settings(CACHES=DUMMY_CACHES):
+            Ingredient.objects.create(name="сода", measurement_unit="г")
+        self.assertEqual(self.search("со"), ["сода", "соль"])
+
+
+class CatalogConditionalGetTest(ApiTestCase):
+    """ETag справочников меняется и после записи в другом процессе."""
+
+    def assert_etag_changed(self, url, change):
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.settings(CACHES=DUMMY_CACHES):
+            change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_tags(self):
+        tag = self.tags[0]
+        tag.name = "Ужин"
+        self.assert_etag_changed(f"/api/tags/{tag.pk}/", tag.save)
+        self.assert_etag_changed("/api/tags/", tag.delete)
+
+    def test_ingredients(self):
+        self.assert_etag_changed(
+            "/api/ingredients/", self.ingredients[0].delete
+        )
+
+
+class RecipeConditionalGetTest(ApiTestCase):
+    """ETag рецепта меняется и без изменения самого рецепта."""
+
+    def setUp(self):
+        super().setUp()
+        (self.recipe,) = self.create_recipes(1)
+        self.url = f"/api/recipes/{self.recipe.pk}/"
+
+    def assert_etag_changed(self, change):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_ingredient(self):
+        ingredient = self.ingredients[0]
+        ingredient.name = "соль морская"
+        data = self.assert_etag_changed(ingredient.save)
+        self.assertIn(
+            "соль морская", [item["name"] for item in data["ingredients"]]
+        )
+
+    def test_tag(self):
+        tag = self.tags[0]
+        tag.name = "Ужин"
+        data = self.assert_etag_changed(tag.save)
+        self.assertEqual(data["tags"][0]["name"], "Ужин")
+
+    def test_author(self):
+        self.author.first_name = "Автор"
+        data = self.assert_etag_changed(self.author.save)
+        self.assertEqual(data["author"]["first_name"], "Автор")
+
+
+class TokenAuthenticationTest(ApiTestCase):
+    """Кэш токенов сбрасывается во всех процессах после записи."""
+
+    def setUp(self):
+        super().setUp()
+        authentication.token_cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def get_me(self):
+        return self.client.get("/api/users/me/").status_code
+
+    def assert_revoked(self, change):
+        self.assertEqual(self.get_me(), 200)
+        # Запись в другом процессе: у него своя LRU, общий только кэш.
+        other_process = authentication.TokenCache(10, 60)
+        with mock.patch.object(authentication, "token_cache", other_process):
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+        self.assertEqual(self.get_me(), 401)
+
+    def test_deleted_token(self):
+        self.assert_revoked(self.token.delete)
+
+    def test_deactivated_user(self):
+        self.user.is_active = False
+        self.assert_revoked(self.user.save)
+
+
+class RelationsResponseTest(ApiTestCase):
+    """Ответы на запись связей и чтение после нее видят новые связи."""
+
+    def setUp(self):
+        super().setUp()
+        (self.recipe,) = self.create_recipes(1)
+        # Связи пользователя уже в кэше.
+        self.client.get("/api/recipes/")
+
+    def get_recipe(self):
+        return self.client.get(f"/api/recipes/{self.recipe.pk}/").data
+
+    def test_subscribe(self):
+        url = f"/api/users/{self.author.pk}/subscribe/"
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data["is_subscribed"])
+        self.assertTrue(self.get_recipe()["author"]["is_subscribed"])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(self.get_recipe()["author"]["is_subscribed"])
+
+    def assert_recipe_relation(self, action, flag):
+        url = f"/api/recipes/{self.recipe.pk}/{action}/"
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["id"], self.recipe.pk)
+        self.assertTrue(self.get_recipe()[flag])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(self.get_recipe()[flag])
+
+    def test_favorite(self):
+        self.assert_recipe_relation("favorite", "is_favorited")
+
+    def test_shopping_cart(self):
+        self.assert_recipe_relation("shopping_cart", "is_in_shopping_cart")
+
+
+class Base64ImageFieldTest(TestCase):
+    """Временный файл изображения закрывается и при ошибке."""
+
+    def test_not_an_image(self):
+        uploads = []
+
+        def create_upload(*args):
+            uploads.append(TemporaryUploadedFile(*args))
+            return uploads[-1]
+
+        data = "data:image/png;base64," + b64encode(b"not an image").decode()
+        with mock.patch.object(fields, "TemporaryUploadedFile", create_upload):
+            # Ошибку ImageField Django сериализатор превращает в свою.
+            with self.assertRaises(DjangoValidationError):
+                fields.StreamingBase64ImageField().to_internal_value(data)
+        (upload,) = uploads
+        self.assertTrue(upload.file.closed)
+
+
+class RelationsSignalsTest(ApiTestCase):
+    """Связи, измененные не через API, тоже сбрасывают кэш."""
+
+    def setUp(self):
+        super().setUp()
+        (self.recipe,) = self.create_recipes(1)
+        self.get_recipe()
+
+    def get_recipe(self):
+        return self.client.get(f"/api/recipes/{self.recipe.pk}/").data
+
+    def assert_flag(self, flag, change, value):
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        data = self.get_recipe()
+        if flag == "is_subscribed":
+            data = data["author"]
+        self.assertEqual(data[flag], value)
+
+    def test_created_and_deleted(self):
+        for model, flag, related in (
+            (FavouriteRecipe, "is_favorited", {"recipe": self.recipe}),
+            (ShoppingList, "is_in_shopping_cart", {"recipe": self.recipe}),
+            (Subscription, "is_subscribed", {"author": self.author}),
+        ):
+            with self.subTest(flag=flag):
+                relation = model(user=self.user, **related)
+                self.assert_flag(flag, relation.save, True)
+                self.assert_flag(flag, relation.delete, False)
+
+
+class CartTotalsTest(ApiTestCase):
+    """Суммы ингредиентов корзины меняются вместе с ней и рецептами."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe, self.other = self.create_recipes(2)
+        self.author_client = APIClient()
+        self.author_client.force_authenticate(self.author)
+
+    def summary(self):
+        response = self.client.get("/api/recipes/shopping_cart_summary/")
+        return {item["name"]: item["amount"] for item in response.data}
+
+    def add(self, recipe):
+        url = f"/api/recipes/{recipe.pk}/shopping_cart/"
+        self.assertEqual(self.client.post(url).status_code, 201)
+
+    def test_add_and_remove(self):
+        self.add(self.recipe)
+        self.add(self.other)
+        self.assertEqual(
+            self.summary(), {"соль": 200, "сахар": 200, "мука": 200}
+        )
+        response = self.client.delete(
+            f"/api/recipes/{self.recipe.pk}/shopping_cart/"
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            self.summary(), {"соль": 100, "сахар": 100, "мука": 100}
+        )
+        self.client.delete(f"/api/recipes/{self.other.pk}/shopping_cart/")
+        self.assertEqual(self.summary(), {})
+
+    def test_edit_and_delete_recipe(self):
+        self.add(self.recipe)
+        self.add(self.other)
+        salt, sugar, _ = self.ingredients
+        response = self.author_client.patch(
+            f"/api/recipes/{self.recipe.pk}/",
+            {
+                "ingredients": [
+                    {"id": salt.pk, "amount": 50},
+                    {"id": sugar.pk, "amount": 300},
+                ],
+                "tags": [self.tags[0].pk],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.summary(), {"соль": 150, "сахар": 400, "мука": 100}
+        )
+        response = self.author_client.delete(f"/api/recipes/{self.recipe.pk}/")
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            self.summary(), {"соль": 100, "сахар": 100, "мука": 100}
+        )
+
+    def test_drifted_totals_clamped(self):
+        self.add(self.recipe)
+        # Суммы меньше рецепта, например после ручной правки в БД.
+        CartIngredientTotal.objects.filter(user=self.user).update(amount=10)
+        self.client.delete(f"/api/recipes/{self.recipe.pk}/shopping_cart/")
+        self.assertEqual(self.summary(), {})
+
+
+@override_settings(JOBS_ALWAYS_EAGER=True)
+class FeedTest(ApiTestCase):
+    """Лента подписок: рассылка, чтение из рецептов и подписка."""
+
+    def setUp(self):
+        super().setUp()
+        # Задачи выполняются сразу, уменьшенным копиям нужен файл.
+        media = TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        images = Path(media.name, "image_recipe")
+        images.mkdir()
+        Image.new("RGB", (8, 8)).save(images / "test.jpg")
+
+    def subscribe(self, method="post"):
+        url = f"/api/users/{self.author.pk}/subscribe/"
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url)
+        self.assertIn(response.status_code, (201, 204))
+
+    def publish(self, count=1):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.create_recipes(count)
+
+    def feed(self, **params):
+        response = self.client.get("/api/recipes/feed/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def feed_ids(self):
+        return [recipe["id"] for recipe in self.feed()["results"]]
+
+    def test_fan_out(self):
+        self.subscribe()
+        (recipe,) = self.publish()
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.user, recipe=recipe).exists()
+        )
+        self.assertEqual(self.feed_ids(), [recipe.pk])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_pull_large_author(self):
+        self.subscribe()
+        (recipe,) = self.publish()
+        recipe.refresh_from_db()
+        self.assertFalse(recipe.in_feeds)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed_ids(), [recipe.pk])
+
+    def test_subscribe_and_unsubscribe(self):
+        recipes = self.publish(3)
+        self.assertEqual(self.feed_ids(), [])
+        self.subscribe()
+        self.assertEqual(
+            self.feed_ids(), [recipe.pk for recipe in reversed(recipes)]
+        )
+        self.subscribe("delete")
+        self.assertEqual(self.feed_ids(), [])
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_pages(self):
+        self.subscribe()
+        recipes = self.publish(3)
+        page = self.feed(limit=2)
+        ids = [recipe["id"] for recipe in page["results"]]
+        response = self.client.get(page["next"])
+        self.assertIsNone(response.data["next"])
+        ids += [recipe["id"] for recipe in response.data["results"]]
+        self.assertEqual(ids, [recipe.pk for recipe in reversed(recipes)])
+
+
+class ShoppingListDownloadTest(ApiTestCase):
+    """Выгрузка списка покупок."""
+
+    def setUp(self):
+        super().setUp()
+        (recipe,) = self.create_recipes(1)
+        ShoppingList.objects.create(user=self.user, recipe=recipe)
+
+    def download(self, file_format):
+        response = self.client.get(
+            "/api/recipes/download_shopping_cart/",
+            {"file_format": file_format},
+        )
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_txt(self):
+        self.assertIn("соль, 100 г".encode(), self.download("txt"))
+
+    @override_settings(SHOPPING_LIST_PDF_FONT="/nonexistent/font.ttf")
+    def test_pdf_without_font(self):
+        with self.assertLogs("api.shopping_list", "WARNING"):
+            content = self.download("pdf")
+        self.assertTrue(content.startswith(b"%PDF"))
+        self.assertTrue(content.rstrip().endswith(b"%%EOF"))
+
+
+REPLICA_CONFIGURED = "replica1" in settings.DATABASES
+
+
+@skipUnless(REPLICA_CONFIGURED, "Реплика не задана: DB_REPLICA_HOSTS")
+class ReplicaRoutingTest(TransactionTestCase):
+    """Чтение с реплики, после записи клиента - с основной БД.
+
+    В TestCase все запросы идут в его транзакции на основной БД, поэтому
+    здесь транзакции настоящие. Реплика в тестах - зеркало основной БД.
+    """
+
+    # Базы пропущенного теста раннер тоже создает.
+    databases = {"default", "replica1"} if REPLICA_CONFIGURED else set()
+
+    def setUp(self):
+        cache.clear()
+        authentication.token_cache.clear()
+        # Справочники изменены давно, иначе их читают с основной БД.
+        CatalogVersion.objects.update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        user = ApiTestCase.create_user("reader")
+        self.recipe = Recipe.objects.create(
+            author=ApiTestCase.create_user("author"),
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image="image_recipe/test.jpg",
+        )
+        self.client = APIClient()
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def request(self, method, url):
+        """Ответ и число запросов к основной БД и к реплике."""
+        primary = CaptureQueriesContext(connections["default"])
+        replica = CaptureQueriesContext(connections["replica1"])
+        with primary, replica:
+            response = getattr(self.client, method)(url)
+        return response, len(primary), len(replica)
+
+    def test_read_from_replica(self):
+        self.client.credentials()
+        response, primary, replica = self.request("get", "/api/tags/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    @override_settings(DATABASE_REPLICA_PIN_SECONDS=1)
+    def test_write_pins_reads_to_primary(self):
+        # Токен уже в кэше: его чтение не попадает в подсчет.
+        self.request("get", "/api/tags/")
+        response, _, _ = self.request(
+            "post", f"/api/recipes/{self.recipe.pk}/favorite/"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.cookies["db_primary"]["max-age"], 1)
+        # Клиент без cookie узнается по токену.
+        self.client.cookies.clear()
+        _, primary, replica = self.request("get", "/api/tags/")
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+        with mock.patch("time.time", return_value=time.time() + 2):
+            _, primary, replica = self.request("get", "/api/tags/")
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 
 from api.views import (
     IngredientsViewSet,
+    MetricsView,
     RecipesViewSet,
     TagsViewSet,
     UserViewSet,
@@ -21,4 +22,5 @@ urlpatterns = [
     path("", include(router_v1.urls)),
     path("", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken")),
+    path("_metrics", MetricsView.as_view(), name="metrics"),
 ]
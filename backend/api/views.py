@@ -1,30 +1,51 @@
+from functools import partial
 from http import HTTPStatus
 
 from django.conf import settings
 from django.db import transaction
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import Prefetch
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import (
+    SAFE_METHODS,
+    AllowAny,
+    IsAdminUser,
+    IsAuthenticated,
+)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
+from recipes.catalogs import INGREDIENTS_CATALOG, TAGS_CATALOG
+from recipes.feed import get_feed
 from recipes.models import (
+    CartIngredientTotal,
     FavouriteRecipe,
     Ingredient,
     Recipe,
-    RecipeIngredients,
     ShoppingList,
     Tag,
 )
 from users.models import User
 
+from .cache import RecipesCacheMixin, mark_relations_changed
+from .conditional import ConditionalGetMixin, RecipesConditionalGetMixin
 from .filters import IngredientsFilter, RecipesFilter
-from .paginations import PageNumberPagination
+from .ingredients_index import get_ingredients_index
+from .metrics import render_metrics
+from .paginations import (
+    CursorPaginationMixin,
+    FeedCursorPagination,
+    PageNumberPagination,
+    RecipesCursorPagination,
+    SubscriptionsCursorPagination,
+)
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (
+    CartIngredientSerializer,
     CheckSubscriptionSerializer,
     FavouriteSerializer,
     IngredientsSerializer,
@@ -35,10 +56,12 @@ from .serializers import (
     SubscriptionSerializer,
     TagsSerializer,
     UserSerializer,
+    get_recipes_limit,
 )
+from .shopping_list import SHOPPING_LIST_FORMATS, get_shopping_list
 
 
-class UserViewSet(GenericViewSet):
+class UserViewSet(CursorPaginationMixin, GenericViewSet):
     """Вью сет пользователей и подписок."""
 
     serializer_class = UserSerializer
@@ -50,15 +73,31 @@ class UserViewSet(GenericViewSet):
         detail=False,
         methods=("GET",),
         serializer_class=SubscriptionSerializer,
+        cursor_pagination_class=SubscriptionsCursorPagination,
     )
     def subscriptions(self, request):
         """Получение списка польвателей"""
-        user = self.request.user
-        user_subscriptions = user.subscribes.all()
-        authors = user_subscriptions.values_list('author__id', flat=True)
-        queryset = User.objects.filter(pk__in=authors)
+        recipes_limit = get_recipes_limit(request)
+        queryset = (
+            User.objects.filter(subscribers__user=request.user)
+            .order_by(*User._meta.ordering)
+            .prefetch_related(
+                Prefetch(
+                    "recipes",
+                    queryset=Recipe.objects.all()[:recipes_limit],
+                    to_attr="limited_recipes",
+                )
+            )
+        )
         paginated_queryset = self.paginate_queryset(queryset)
-        serializer = self.get_serializer(paginated_queryset, many=True)
+        serializer = self.get_serializer(
+            paginated_queryset,
+            many=True,
+            context={
+                **self.get_serializer_context(),
+                "recipes_limit": recipes_limit,
+            },
+        )
 
         return self.get_paginated_response(serializer.data)
 
@@ -67,6 +106,7 @@ class UserViewSet(GenericViewSet):
         methods=("POST", "DELETE"),
         serializer_class=CheckSubscriptionSerializer,
     )
+    @transaction.atomic()
     def subscribe(self, request, pk=None):
         """Создание и удаление подписок."""
         user = self.request.user
@@ -83,8 +123,13 @@ class UserViewSet(GenericViewSet):
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
+            mark_relations_changed(request)
             serializer = SubscriptionSerializer(
-                author, context={"request": request}
+                author,
+                context={
+                    "request": request,
+                    "recipes_limit": get_recipes_limit(request),
+                },
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -95,37 +140,72 @@ class UserViewSet(GenericViewSet):
             )
             serializer.is_valid(raise_exception=True)
             user.subscribes.filter(author=author).delete()
+            mark_relations_changed(request)
 
             return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+class TagsViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет тегов."""
 
     permission_classes = (AllowAny,)
+    catalogs = (TAGS_CATALOG,)
     queryset = Tag.objects.all()
     serializer_class = TagsSerializer
     pagination_class = None
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет ингридиентов."""
 
     permission_classes = (AllowAny,)
+    catalogs = (INGREDIENTS_CATALOG,)
     queryset = Ingredient.objects.all()
     serializer_class = IngredientsSerializer
     filter_backends = (IngredientsFilter,)
     search_fields = ('^name',)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return self.get_conditional_response(
+            request, self.get_list_validators(request), self.search
+        )
+
+    def search(self, request):
+        """Поиск по индексу ингредиентов в памяти процесса."""
+        name = request.query_params.get(IngredientsFilter.search_param, "")
+        return Response(
+            get_ingredients_index().search(
+                name, settings.INGREDIENTS_SEARCH_LIMIT if name else None
+            )
+        )
+
 
-class RecipesViewSet(viewsets.ModelViewSet):
+class RecipesViewSet(
+    RecipesConditionalGetMixin,
+    RecipesCacheMixin,
+    CursorPaginationMixin,
+    viewsets.ModelViewSet,
+):
     """Вьюсет для рецептов."""
 
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrReadOnly,)
     filterset_class = RecipesFilter
     pagination_class = PageNumberPagination
+    cursor_pagination_class = RecipesCursorPagination
+
+    def get_queryset(self):
+        if self.request.method in SAFE_METHODS:
+            return Recipe.objects.with_related()
+        return super().get_queryset()
+
+    def use_cursor_pagination(self):
+        # Курсор упорядочивает по дате и потерял бы порядок релевантности.
+        return (
+            "search" not in self.request.query_params
+            and super().use_cursor_pagination()
+        )
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
@@ -188,38 +268,72 @@ class RecipesViewSet(viewsets.ModelViewSet):
     def add_object(self, model, user, pk):
         recipe = get_object_or_404(Recipe, id=pk)
         model.objects.create(user=user, recipe=recipe)
+        mark_relations_changed(self.request)
         serializer = ShortRecipeSerializer(recipe)
         return Response(serializer.data, status=HTTPStatus.CREATED)
 
     @transaction.atomic()
     def delete_object(self, model, user, pk):
         model.objects.filter(user=user, recipe__id=pk).delete()
+        mark_relations_changed(self.request)
         return Response(status=HTTPStatus.NO_CONTENT)
 
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        pagination_class=FeedCursorPagination,
+        cursor_pagination_class=None,
+    )
+    def feed(self, request):
+        """Рецепты авторов из подписок, новые первыми."""
+        rows = self.paginate_queryset(partial(get_feed, request.user))
+        recipes = Recipe.objects.with_related().in_bulk([pk for _, pk in rows])
+        serializer = self.get_serializer(
+            [recipes[pk] for _, pk in rows if pk in recipes], many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
     @action(
         methods=["GET"], detail=False, permission_classes=(IsAuthenticated,)
     )
-    def download_shopping_cart(self, request):
-        shopping_cart = ShoppingList.objects.filter(user=self.request.user)
-        recipes = [item.recipe.id for item in shopping_cart]
-        buy_list = (
-            RecipeIngredients.objects.filter(recipe__in=recipes)
-            .values("ingredient")
-            .annotate(amount=Sum("amount"))
+    def shopping_cart_summary(self, request):
+        """Ингредиенты корзины с общим количеством."""
+        queryset = (
+            CartIngredientTotal.objects.filter(user=request.user)
+            .select_related("ingredient")
+            .order_by("ingredient__name", "ingredient__measurement_unit")
         )
+        return Response(CartIngredientSerializer(queryset, many=True).data)
 
-        buy_list_text = settings.TITLE_SHOP_LIST
-        for item in buy_list:
-            ingredient = Ingredient.objects.get(pk=item["ingredient"])
-            amount = item["amount"]
-            buy_list_text += (
-                f"{ingredient.name}, {amount} "
-                f"{ingredient.measurement_unit}\n"
+    @action(
+        methods=["GET"], detail=False, permission_classes=(IsAuthenticated,)
+    )
+    def download_shopping_cart(self, request):
+        file_format = request.query_params.get("file_format", "txt")
+        if file_format not in SHOPPING_LIST_FORMATS:
+            raise ValidationError(
+                {
+                    "file_format": "Доступные форматы: "
+                    + ", ".join(SHOPPING_LIST_FORMATS)
+                }
             )
-
-        response = HttpResponse(buy_list_text, content_type="text/plain")
-        response[
-            "Content-Disposition"
-        ] = f"attachment; filename={settings.FILE_NAME}"
+        render, content_type = SHOPPING_LIST_FORMATS[file_format]
+        items = get_shopping_list(request.user).iterator()
+        response = StreamingHttpResponse(
+            render(items), content_type=content_type
+        )
+        filename = f"{settings.FILE_NAME}.{file_format}"
+        response["Content-Disposition"] = f"attachment; filename={filename}"
 
         return response
+
+
+class MetricsView(APIView):
+    """Метрики запросов в формате Prometheus, доступны персоналу."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        content, content_type = render_metrics()
+        return HttpResponse(content, content_type=content_type)
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Кэши, которые у каждого процесса свои.
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def is_cache_shared():
+    """Видят ли все процессы один и тот же кэш default."""
+    return settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES
+
+
+def require_shared_cache(reason):
+    """Ошибка запуска, если кэш у каждого процесса свой.
+
+    Версии в кэше сбрасывают сохраненные ответы, связи пользователей
+    и привязку к основной БД: при своем кэше в каждом процессе запись
+    в одном из них другие не видят и отдают устаревшие данные.
+    """
+    if not is_cache_shared():
+        raise ImproperlyConfigured(
+            f"{reason}: нужен общий для процессов кэш, задайте "
+            "CACHE_BACKEND и CACHE_LOCATION (например Redis: "
+            "django.core.cache.backends.redis.RedisCache, "
+            "redis://redis:6379/0)"
+        )
@@ -0,0 +1,38 @@
+from functools import partial
+
+from django.db.backends.postgresql import base
+
+from .pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с пулом соединений процесса.
+
+    Настройки пула - в OPTIONS["pool"]: min_size, max_size, timeout,
+    max_idle и max_lifetime. Закрытое Django соединение возвращается
+    в пул, при CONN_HEALTH_CHECKS пул проверяет его перед выдачей.
+    """
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, **self.settings_dict["OPTIONS"]["pool"])
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("pool")
+        return params
+
+    def get_new_connection(self, conn_params):
+        return self.pool.get(
+            partial(super().get_new_connection, conn_params),
+            check=self.settings_dict["CONN_HEALTH_CHECKS"],
+        )
+
+    def _close(self):
+        if self.connection is not None:
+            # Соединение, закрытое внутри транзакции или после ошибки,
+            # в пул не возвращается.
+            self.pool.put(
+                self.connection,
+                discard=self.in_atomic_block or self.errors_occurred,
+            )
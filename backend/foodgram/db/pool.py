@@ -0,0 +1,248 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+from api.metrics import (
+    DB_POOL_CONNECTIONS,
+    DB_POOL_CONNECTS,
+    DB_POOL_TIMEOUTS,
+    DB_POOL_WAIT,
+)
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Свободное соединение не появилось за отведенное время."""
+
+
+class ConnectionPool:
+    """Соединения psycopg2 одного процесса.
+
+    Открыто не больше max_size соединений, min_size из них открываются
+    заранее и не закрываются при простое. Остальные закрываются после
+    max_idle секунд простоя, любое соединение - через max_lifetime
+    секунд после открытия. Когда все соединения заняты, поток ждет
+    освободившееся не дольше timeout секунд.
+    """
+
+    def __init__(
+        self,
+        alias,
+        min_size=0,
+        max_size=10,
+        timeout=10,
+        max_idle=600,
+        max_lifetime=3600,
+    ):
+        self.alias = alias
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.pid = os.getpid()
+        self.condition = threading.Condition()
+        # Свободные соединения и время их возврата, последним
+        # выдается недавно возвращенное.
+        self.idle = deque()
+        self.opened_at = {}
+        self.size = 0
+        self.filling = False
+
+    def get(self, connect, check=False):
+        """Свободное соединение или новое, открытое функцией connect.
+
+        При check свободное соединение перед выдачей проверяется
+        запросом к БД, разорванные закрываются.
+        """
+        start = time.monotonic()
+        while True:
+            connection = self.acquire(start + self.timeout)
+            if connection is None:
+                connection = self.open(connect)
+                break
+            if not check or self.is_usable(connection):
+                break
+            self.discard(connection)
+        DB_POOL_WAIT.labels(self.alias).observe(time.monotonic() - start)
+        if self.size < self.min_size and not self.filling:
+            self.filling = True
+            threading.Thread(
+                target=self.fill, args=(connect,), daemon=True
+            ).start()
+        return connection
+
+    def acquire(self, deadline):
+        """Свободное соединение или None, если можно открыть новое."""
+        expired = []
+        try:
+            with self.condition:
+                while True:
+                    while self.idle:
+                        connection, _ = self.idle.pop()
+                        if not connection.closed and not self.is_expired(
+                            connection
+                        ):
+                            self.update_metrics()
+                            return connection
+                        expired.append(self.forget(connection))
+                    if self.size < self.max_size:
+                        self.size += 1
+                        self.update_metrics()
+                        return None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        DB_POOL_TIMEOUTS.labels(self.alias).inc()
+                        raise PoolTimeout(
+                            f"Нет свободного соединения в пуле {self.alias} "
+                            f"за {self.timeout} с"
+                        )
+                    self.condition.wait(remaining)
+        finally:
+            close_quietly(expired)
+
+    def open(self, connect):
+        try:
+            connection = connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.update_metrics()
+                self.condition.notify()
+            raise
+        DB_POOL_CONNECTS.labels(self.alias).inc()
+        with self.condition:
+            self.opened_at[connection] = time.monotonic()
+        return connection
+
+    def fill(self, connect):
+        """Открытие соединений до min_size в фоновом потоке."""
+        try:
+            while True:
+                with self.condition:
+                    if self.size >= self.min_size:
+                        return
+                    self.size += 1
+                self.put(self.open(connect))
+        except Exception:
+            logger.exception("Не удалось заполнить пул %s", self.alias)
+        finally:
+            self.filling = False
+
+    def put(self, connection, discard=False):
+        """Возврат соединения; начатая транзакция откатывается."""
+        if connection not in self.opened_at:
+            # Чужое соединение, например унаследованное при fork: его
+            # закрытие оборвало бы сессию родительского процесса.
+            return
+        if not discard and not connection.closed:
+            status = connection.info.transaction_status
+            if status in (
+                extensions.TRANSACTION_STATUS_INTRANS,
+                extensions.TRANSACTION_STATUS_INERROR,
+            ):
+                try:
+                    connection.rollback()
+                except psycopg2.Error:
+                    discard = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                discard = True
+        if discard or connection.closed or self.is_expired(connection):
+            self.discard(connection)
+            return
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            stale = self.trim()
+            self.update_metrics()
+            self.condition.notify()
+        close_quietly(stale)
+
+    def discard(self, connection):
+        with self.condition:
+            self.forget(connection)
+            self.update_metrics()
+            self.condition.notify()
+        close_quietly([connection])
+
+    def close(self):
+        """Закрытие свободных соединений, занятые остаются у потоков."""
+        with self.condition:
+            connections = [self.forget(item) for item, _ in self.idle]
+            self.idle.clear()
+            self.update_metrics()
+        close_quietly(connections)
+
+    def trim(self):
+        """Соединения сверх min_size, простаивающие дольше max_idle."""
+        stale = []
+        now = time.monotonic()
+        while (
+            self.idle
+            and self.size > self.min_size
+            and now - self.idle[0][1] > self.max_idle
+        ):
+            stale.append(self.forget(self.idle.popleft()[0]))
+        return stale
+
+    def forget(self, connection):
+        self.opened_at.pop(connection, None)
+        self.size -= 1
+        return connection
+
+    def is_expired(self, connection):
+        return (
+            time.monotonic() - self.opened_at[connection] > self.max_lifetime
+        )
+
+    def is_usable(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if (
+                connection.info.transaction_status
+                != extensions.TRANSACTION_STATUS_IDLE
+            ):
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def update_metrics(self):
+        DB_POOL_CONNECTIONS.labels(self.alias, "idle").set(len(self.idle))
+        DB_POOL_CONNECTIONS.labels(self.alias, "used").set(
+            self.size - len(self.idle)
+        )
+
+
+def close_quietly(connections):
+    for connection in connections:
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+
+def get_pool(alias, **options):
+    """Пул текущего процесса: после fork создается новый."""
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[alias] = ConnectionPool(alias, **options)
+        return pool
+
+
+def close_pools():
+    """Закрытие свободных соединений всех пулов процесса."""
+    with _pools_lock:
+        pools = [pool for pool in _pools.values() if pool.pid == os.getpid()]
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,52 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# База для чтения в текущем запросе, вне запросов - основная.
+_read_database = ContextVar("read_database", default=DEFAULT_DB_ALIAS)
+
+
+def set_read_database(alias):
+    """База для чтения до reset_read_database с возвращенным токеном."""
+    return _read_database.set(alias)
+
+
+def reset_read_database(token):
+    _read_database.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Чтение с основной БД внутри блока with."""
+    token = _read_database.set(DEFAULT_DB_ALIAS)
+    try:
+        yield
+    finally:
+        _read_database.reset(token)
+
+
+def is_recent(timestamp):
+    """Изменение с отметкой времени timestamp могло не дойти до реплик."""
+    return time.time() - timestamp < settings.DATABASE_REPLICA_PIN_SECONDS
+
+
+class ReplicaRouter:
+    """Запись в основную БД, чтение - с реплики, выбранной на запрос."""
+
+    def db_for_read(self, model, **hints):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Внутри транзакции читается то, что в ней записано.
+            return DEFAULT_DB_ALIAS
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -43,18 +43,22 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "djoser",
     "rest_framework.authtoken",
     "api.apps.ApiConfig",
     "users.apps.UsersConfig",
     "recipes.apps.RecipesConfig",
+    "jobs.apps.JobsConfig",
     "django_filters",
 ]
 
 AUTH_USER_MODEL = "users.User"
 
 MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",
+    "api.middleware.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -103,6 +107,52 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
         "HOST": os.getenv("DB_HOST", ""),
         "PORT": os.getenv("DB_PORT", 5432),
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 0)),
+        "CONN_HEALTH_CHECKS": (
+            os.getenv("DB_CONN_HEALTH_CHECKS", default="False") == "True"
+        ),
+    }
+}
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 0))
+if DB_POOL_MAX_SIZE:
+    # Соединения берутся из пула процесса и возвращаются в него в конце
+    # каждого запроса, поэтому постоянные соединения потоков не нужны.
+    DATABASES["default"].update(
+        ENGINE="foodgram.db",
+        CONN_MAX_AGE=0,
+        OPTIONS={
+            "pool": {
+                "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 0)),
+                "max_size": DB_POOL_MAX_SIZE,
+                "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+            }
+        },
+    )
+
+# Реплики только для чтения, по одной на адрес из DB_REPLICA_HOSTS.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+    filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(",")), start=1
+):
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{number}")
+DATABASE_ROUTERS = (
+    ["foodgram.db.router.ReplicaRouter"] if DATABASE_REPLICAS else []
+)
+# Сколько секунд после записи клиент читает с основной БД.
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("DB_REPLICA_PIN_SECONDS", 5))
+
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
     }
 }
 
@@ -130,7 +180,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend"
@@ -167,8 +217,32 @@ USERNAME_MAX_CHAR_LENGTH = 150
 MAX_CHAR_LENGTH = 200
 MAX_EMAIL_LENGTH = 254
 MAX_COLOR_LENGTH = 7
-FILE_NAME = "shopping-list.txt"
+FILE_NAME = "shopping-list"
 TITLE_SHOP_LIST = "Список покупок с сайта Foodgram:\n\n"
+JOBS_ALWAYS_EAGER = os.getenv("JOBS_ALWAYS_EAGER", default="False") == "True"
+JOBS_WORKER_CONCURRENCY = int(os.getenv("JOBS_WORKER_CONCURRENCY", 4))
+JOBS_POLL_INTERVAL = 1
+JOBS_RETRY_DELAY = 10
+JOBS_TIMEOUT = 15 * 60
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv("AUTH_TOKEN_CACHE_TIMEOUT", 60))
+AUTH_TOKEN_SHARED_CACHE = (
+    os.getenv("AUTH_TOKEN_SHARED_CACHE", default="False") == "True"
+)
+# С большим числом подписчиков рецепты автора не копируются в ленты.
+FEED_FANOUT_LIMIT = int(os.getenv("FEED_FANOUT_LIMIT", 10000))
+INGREDIENTS_SEARCH_LIMIT = int(os.getenv("INGREDIENTS_SEARCH_LIMIT", 50))
+RECIPE_IMAGE_SIZES = {"small": 320, "medium": 640}
+RECIPE_IMAGE_QUALITY = 80
+RECIPE_SEARCH_CONFIG = "russian"
+RECIPES_CACHE_TIMEOUT = int(os.getenv("RECIPES_CACHE_TIMEOUT", 600))
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    "SHOPPING_LIST_PDF_FONT",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+USER_RELATIONS_CACHE_TIMEOUT = int(
+    os.getenv("USER_RELATIONS_CACHE_TIMEOUT", 300)
+)
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
@@ -0,0 +1,63 @@
+"""Настройки gunicorn, читаются из текущего каталога автоматически.
+
+GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker запускает режим
+ASGI, по умолчанию - потоки gthread.
+"""
+import multiprocessing
+import os
+
+ASGI_WORKER_CLASS = "uvicorn.workers.UvicornWorker"
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:10000")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+wsgi_app = (
+    "foodgram.asgi:application"
+    if worker_class == ASGI_WORKER_CLASS
+    else "foodgram.wsgi:application"
+)
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() + 1))
+# У каждого потока свое соединение с БД, пул процесса должен вмещать
+# их все (DB_POOL_MAX_SIZE не меньше threads).
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+# Приложение загружается один раз в мастере, воркеры стартуют быстрее
+# и делят память с ним.
+preload_app = True
+# Перезапуск воркеров против утечек памяти, разброс не дает им
+# перезапуститься одновременно.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = max_requests // 10
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    # Воркеры с кэшем в памяти каждого не видят версий, которые
+    # поднимают записи в других воркерах.
+    if server.cfg.workers < 2:
+        return
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
+    from foodgram.caches import require_shared_cache
+
+    require_shared_cache(f"gunicorn, воркеров: {server.cfg.workers}")
+
+
+def pre_fork(server, worker):
+    # Соединения с БД, открытые мастером при загрузке приложения,
+    # не должны достаться воркерам.
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+
+    from foodgram.db.pool import close_pools
+
+    connections.close_all()
+    close_pools()
+
+
+def child_exit(server, worker):
+    # Метрики livesum (пул соединений) завершенного воркера.
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobInAdmin(admin.ModelAdmin):
+    """Класс фоновых задач для отображения в админке."""
+
+    list_display = (
+        "id",
+        "name",
+        "status",
+        "attempts",
+        "max_attempts",
+        "run_at",
+        "finished_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("name",)
+    readonly_fields = ("created_at", "started_at", "finished_at")
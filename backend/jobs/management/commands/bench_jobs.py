@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from jobs.models import Job
+from jobs.tasks import background
+from jobs.worker import Worker
+
+
+@background
+def sleep_job(seconds):
+    time.sleep(seconds)
+
+
+class Command(BaseCommand):
+    help = "Пропускная способность очереди фоновых задач"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--processes", action="store_true")
+        parser.add_argument(
+            "--work-ms",
+            type=float,
+            default=0,
+            help="Длительность одной задачи, мс",
+        )
+
+    def handle(self, *args, **options):
+        count = options["jobs"]
+        start = time.perf_counter()
+        with transaction.atomic():
+            for _ in range(count):
+                sleep_job.delay(options["work_ms"] / 1000)
+        enqueue_time = time.perf_counter() - start
+
+        # Только свои задачи: настоящая очередь остается воркеру.
+        worker = Worker(
+            options["concurrency"],
+            options["processes"],
+            names=[sleep_job.name],
+        )
+        start = time.perf_counter()
+        worker.run(burst=True)
+        run_time = time.perf_counter() - start
+
+        Job.objects.filter(name=sleep_job.name).delete()
+        self.stdout.write(
+            f"Постановка: {count / enqueue_time:.0f} задач/с\n"
+            f"Выполнение: {worker.processed / run_time:.0f} задач/с "
+            f"({worker.processed} задач, ошибок: {worker.failed}, "
+            f"параллельно: {worker.concurrency}, "
+            f"{'процессы' if options['processes'] else 'потоки'})"
+        )
@@ -0,0 +1,57 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from foodgram.caches import require_shared_cache
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Обработчик фоновых задач из очереди в базе данных"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.JOBS_WORKER_CONCURRENCY,
+            help="Число одновременно выполняемых задач",
+        )
+        parser.add_argument(
+            "--processes",
+            action="store_true",
+            help="Пул процессов вместо пула потоков",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help="Пауза между опросами пустой очереди, сек",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Завершиться, когда очередь опустеет",
+        )
+
+    def handle(self, *args, **options):
+        # Задачи поднимают версии в кэше (копии изображений рецептов),
+        # процессы gunicorn должны их видеть.
+        require_shared_cache("runworker")
+        worker = Worker(
+            options["concurrency"],
+            processes=options["processes"],
+            poll_interval=options["poll_interval"],
+        )
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(
+            f"Воркер запущен, параллельных задач: {worker.concurrency}"
+        )
+        worker.run(burst=options["burst"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Воркер остановлен, выполнено задач: {worker.processed}, "
+                f"с ошибкой: {worker.failed}"
+            )
+        )
@@ -0,0 +1,111 @@
+# Generated by Django 4.2.3 on 2026-10-18 04:48
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'name',
+                    models.CharField(max_length=200, verbose_name='Задача'),
+                ),
+                (
+                    'args',
+                    models.JSONField(default=list, verbose_name='Аргументы'),
+                ),
+                (
+                    'kwargs',
+                    models.JSONField(
+                        default=dict, verbose_name='Именованные аргументы'
+                    ),
+                ),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[
+                            ('queued', 'В очереди'),
+                            ('running', 'Выполняется'),
+                            ('done', 'Выполнена'),
+                            ('failed', 'Ошибка'),
+                        ],
+                        default='queued',
+                        max_length=10,
+                        verbose_name='Статус',
+                    ),
+                ),
+                (
+                    'attempts',
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name='Попытки'
+                    ),
+                ),
+                (
+                    'max_attempts',
+                    models.PositiveSmallIntegerField(
+                        default=3, verbose_name='Максимум попыток'
+                    ),
+                ),
+                (
+                    'run_at',
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name='Запустить не раньше',
+                    ),
+                ),
+                (
+                    'created_at',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='Дата создания'
+                    ),
+                ),
+                (
+                    'started_at',
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name='Начало выполнения'
+                    ),
+                ),
+                (
+                    'finished_at',
+                    models.DateTimeField(
+                        blank=True,
+                        null=True,
+                        verbose_name='Окончание выполнения',
+                    ),
+                ),
+                (
+                    'last_error',
+                    models.TextField(
+                        blank=True, verbose_name='Последняя ошибка'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Задача',
+                'verbose_name_plural': 'Задачи',
+                'ordering': ('run_at', 'id'),
+                'indexes': [
+                    models.Index(
+                        fields=['status', 'run_at'],
+                        name='job_status_run_at_idx',
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди на базе данных."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = (
+        (QUEUED, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Выполнена"),
+        (FAILED, "Ошибка"),
+    )
+
+    name = models.CharField(
+        max_length=settings.MAX_CHAR_LENGTH,
+        verbose_name="Задача",
+    )
+    args = models.JSONField(default=list, verbose_name="Аргументы")
+    kwargs = models.JSONField(
+        default=dict, verbose_name="Именованные аргументы"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+        verbose_name="Статус",
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name="Попытки"
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3, verbose_name="Максимум попыток"
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now, verbose_name="Запустить не раньше"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Дата создания"
+    )
+    started_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Начало выполнения"
+    )
+    finished_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Окончание выполнения"
+    )
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+
+    class Meta:
+        ordering = ("run_at", "id")
+        indexes = (
+            models.Index(
+                fields=("status", "run_at"), name="job_status_run_at_idx"
+            ),
+        )
+        verbose_name = "Задача"
+        verbose_name_plural = "Задачи"
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
@@ -0,0 +1,60 @@
+from datetime import timedelta
+from functools import update_wrapper
+from importlib import import_module
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Job
+
+_registry = {}
+
+
+class BackgroundTask:
+    """Функция, которую можно поставить в очередь через delay."""
+
+    def __init__(self, func, max_attempts):
+        self.func = func
+        self.max_attempts = max_attempts
+        self.name = f"{func.__module__}.{func.__qualname__}"
+        update_wrapper(self, func)
+        _registry[self.name] = self
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.schedule(args, kwargs)
+
+    def schedule(self, args=(), kwargs=None, countdown=0):
+        """Задача сохраняется в текущей транзакции вызывающего кода.
+
+        Воркер увидит ее только после фиксации транзакции, в режиме
+        JOBS_ALWAYS_EAGER функция выполняется сразу после фиксации.
+        """
+        kwargs = kwargs or {}
+        if settings.JOBS_ALWAYS_EAGER:
+            transaction.on_commit(lambda: self.func(*args, **kwargs))
+            return None
+        return Job.objects.create(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            max_attempts=self.max_attempts,
+            run_at=timezone.now() + timedelta(seconds=countdown),
+        )
+
+
+def background(func=None, *, max_attempts=3):
+    """Декоратор фоновой задачи: func.delay(*args) ставит ее в очередь."""
+    if func is None:
+        return lambda func: BackgroundTask(func, max_attempts)
+    return BackgroundTask(func, max_attempts)
+
+
+def get_task(name):
+    """Задача по имени, модуль с ней импортируется при необходимости."""
+    if name not in _registry:
+        import_module(name.rpartition(".")[0])
+    return _registry[name]
@@ -0,0 +1,173 @@
+import logging
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import (
+    connection,
+    connections,
+    transaction,
+)
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+from .tasks import get_task
+
+logger = logging.getLogger(__name__)
+
+STALE_ERROR = "Задача не завершилась за JOBS_TIMEOUT, попытки исчерпаны"
+
+
+def claim_jobs(limit, names=None):
+    """Захват готовых к запуску задач, names - только задач с этими именами.
+
+    SELECT ... FOR UPDATE SKIP LOCKED позволяет нескольким воркерам
+    разбирать очередь без блокировок друг друга. Задачи, зависшие в
+    статусе running дольше JOBS_TIMEOUT, считаются брошенными и
+    запускаются снова, пока не исчерпаны попытки.
+    """
+    now = timezone.now()
+    queue = Job.objects.all()
+    if names is not None:
+        queue = queue.filter(name__in=names)
+    stale = Q(
+        status=Job.RUNNING,
+        started_at__lt=now - timedelta(seconds=settings.JOBS_TIMEOUT),
+    )
+    queue.filter(stale, attempts__gte=F("max_attempts")).update(
+        status=Job.FAILED,
+        finished_at=now,
+        last_error=STALE_ERROR,
+    )
+    ready = queue.filter(
+        Q(status=Job.QUEUED, run_at__lte=now)
+        | stale & Q(attempts__lt=F("max_attempts"))
+    )
+    claim = {
+        "status": Job.RUNNING,
+        "attempts": F("attempts") + 1,
+        "started_at": now,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            jobs = list(ready.select_for_update(skip_locked=True)[:limit])
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(**claim)
+    else:
+        # Без SKIP LOCKED (SQLite) задача захватывается условным UPDATE.
+        jobs = [
+            job
+            for job in ready[:limit]
+            if Job.objects.filter(
+                pk=job.pk, status=job.status, attempts=job.attempts
+            ).update(**claim)
+        ]
+    for job in jobs:
+        job.attempts += 1
+    return jobs
+
+
+def close_broken_connections():
+    """Соединения потока живут между задачами, закрываются после сбоев."""
+    for conn in connections.all(initialized_only=True):
+        if conn.errors_occurred and not conn.is_usable():
+            conn.close()
+
+
+def run_job(job):
+    """Выполнение задачи и запись результата, при ошибке - повтор."""
+    try:
+        get_task(job.name)(*job.args, **job.kwargs)
+    except Exception:
+        logger.exception("Задача %s #%s завершилась ошибкой", job.name, job.pk)
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            changes = {"status": Job.FAILED, "finished_at": timezone.now()}
+        else:
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            changes = {
+                "status": Job.QUEUED,
+                "run_at": timezone.now() + timedelta(seconds=delay),
+            }
+        Job.objects.filter(pk=job.pk).update(last_error=error, **changes)
+        return False
+    else:
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.DONE, finished_at=timezone.now()
+        )
+        return True
+    finally:
+        close_broken_connections()
+
+
+class Worker:
+    """Цикл разбора очереди в пуле потоков или процессов."""
+
+    def __init__(
+        self, concurrency, processes=False, poll_interval=1, names=None
+    ):
+        self.concurrency = concurrency
+        self.names = names
+        self.processes = processes
+        self.poll_interval = poll_interval
+        self.stopping = False
+        self.processed = 0
+        self.failed = 0
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def create_pool(self):
+        if self.processes:
+            # Процессы запускаются заново, без унаследованных соединений с БД.
+            return ProcessPoolExecutor(
+                self.concurrency,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            )
+        return ThreadPoolExecutor(
+            self.concurrency, thread_name_prefix="jobs-worker"
+        )
+
+    def collect(self, futures):
+        for future in futures:
+            self.processed += 1
+            self.failed += not future.result()
+
+    def run(self, burst=False):
+        """Разбор очереди; в режиме burst - до ее опустошения.
+
+        Пока пул занят, про запас захватывается еще столько же задач,
+        чтобы не обращаться к очереди после каждой выполненной.
+        """
+        capacity = self.concurrency * 2
+        running = set()
+        with self.create_pool() as pool:
+            while not self.stopping:
+                jobs = []
+                if len(running) <= self.concurrency:
+                    jobs = claim_jobs(capacity - len(running), self.names)
+                running.update(pool.submit(run_job, job) for job in jobs)
+                if not running:
+                    if burst:
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+                if len(running) > self.concurrency:
+                    timeout = None
+                else:
+                    timeout = 0 if jobs else self.poll_interval
+                done, running = wait(
+                    running, timeout=timeout, return_when=FIRST_COMPLETED
+                )
+                self.collect(done)
+            self.collect(wait(running).done)
@@ -1,5 +1,14 @@
 from django.contrib import admin
+from django.utils.text import Truncator
 
+from api.admin_utils import (
+    AuthorFilter,
+    RecipeFilter,
+    ScalableAdminMixin,
+    UserFilter,
+)
+
+from .cart import add_recipe_to_totals, subtract_recipe_from_totals
 from .models import (
     FavouriteRecipe,
     Ingredient,
@@ -20,7 +29,7 @@ class TagInAdmin(admin.ModelAdmin):
 
 
 @admin.register(Ingredient)
-class IngredientInAdmin(admin.ModelAdmin):
+class IngredientInAdmin(ScalableAdminMixin, admin.ModelAdmin):
     """Класс ингредиентов для отображения в админке."""
 
     empty_value_display = "значение отсутствует"
@@ -32,10 +41,18 @@ class IngredientsInLine(admin.TabularInline):
     model = RecipeIngredients
     extra = 0
     min_num = 1
+    autocomplete_fields = ("ingredient",)
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("recipe", "ingredient")
+        )
 
 
 @admin.register(Recipe)
-class RecipeInAdmin(admin.ModelAdmin):
+class RecipeInAdmin(ScalableAdminMixin, admin.ModelAdmin):
     """Класс рецептов для отображения в админке."""
 
     list_display = (
@@ -44,40 +61,51 @@ class RecipeInAdmin(admin.ModelAdmin):
         "cooking_time",
         "image",
         "author",
-        "text",
+        "short_text",
         "favorites_count",
+        "in_carts_count",
     )
+    list_select_related = ("author",)
     search_fields = ("name",)
-    list_filter = (
-        "author",
-        "name",
-        "cooking_time",
-    )
+    list_filter = (AuthorFilter, "tags", "cooking_time")
     list_editable = ("name",)
+    autocomplete_fields = ("author", "tags")
     inlines = (IngredientsInLine,)
     empty_value_display = "-пусто-"
 
-    def favorites_count(self, obj):
-        return obj.favorites_count()
+    def save_related(self, request, form, formsets, change):
+        # Ингредиенты меняются формами по одному, корзины с рецептом
+        # пересчитываются целиком: до изменений и после.
+        if change:
+            subtract_recipe_from_totals(form.instance.pk)
+        super().save_related(request, form, formsets, change)
+        if change:
+            add_recipe_to_totals(form.instance.pk)
 
-    favorites_count.short_description = "Количество добавлений в избранное"
+    @admin.display(description="Описание рецепта")
+    def short_text(self, obj):
+        return Truncator(obj.text).chars(50)
 
 
 @admin.register(FavouriteRecipe)
-class FavouriteRecipeInAdmin(admin.ModelAdmin):
+class FavouriteRecipeInAdmin(ScalableAdminMixin, admin.ModelAdmin):
     """Класс избранных для отображения в админке."""
 
     empty_value_display = "значение отсутствует"
     list_display = ("id", "user", "recipe")
-    search_fields = ("user", "recipe")
-    list_filter = ("user", "recipe")
+    list_select_related = ("user", "recipe")
+    search_fields = ("user__username", "recipe__name")
+    list_filter = (UserFilter, RecipeFilter)
+    autocomplete_fields = ("user", "recipe")
 
 
 @admin.register(ShoppingList)
-class ShoppingListInAdmin(admin.ModelAdmin):
+class ShoppingListInAdmin(ScalableAdminMixin, admin.ModelAdmin):
     """Класс избранных для отображения в админке."""
 
     empty_value_display = "значение отсутствует"
     list_display = ("id", "user", "recipe")
-    search_fields = ("user", "recipe")
-    list_filter = ("user", "recipe")
+    list_select_related = ("user", "recipe")
+    search_fields = ("user__username", "recipe__name")
+    list_filter = (UserFilter, RecipeFilter)
+    autocomplete_fields = ("user", "recipe")
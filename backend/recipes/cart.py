@@ -0,0 +1,104 @@
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Greatest
+
+from .models import CartIngredientTotal, RecipeIngredients, ShoppingList
+
+
+def quoted_tables():
+    quote = connection.ops.quote_name
+    return (
+        quote(CartIngredientTotal._meta.db_table),
+        quote(ShoppingList._meta.db_table),
+        quote(RecipeIngredients._meta.db_table),
+    )
+
+
+def add_recipe_to_totals(recipe_id, user_id=None):
+    """Ингредиенты рецепта прибавляются к корзинам, где он лежит.
+
+    Один INSERT ... ON CONFLICT: новые строки создаются, существующие
+    увеличиваются без чтения и без гонок между запросами.
+    """
+    totals, cart, items = quoted_tables()
+    sql = (
+        f"INSERT INTO {totals} (user_id, ingredient_id, amount) "
+        "SELECT cart.user_id, item.ingredient_id, item.amount "
+        f"FROM {cart} cart JOIN {items} item "
+        "ON item.recipe_id = cart.recipe_id WHERE cart.recipe_id = %s"
+    )
+    params = [recipe_id]
+    if user_id is not None:
+        sql += " AND cart.user_id = %s"
+        params.append(user_id)
+    sql += (
+        " ON CONFLICT (user_id, ingredient_id) "
+        f"DO UPDATE SET amount = {totals}.amount + EXCLUDED.amount"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def subtract_recipe_from_totals(recipe_id, user_id=None):
+    """Ингредиенты рецепта вычитаются, обнулившиеся строки удаляются."""
+    if user_id is None:
+        users = {
+            "user__in": ShoppingList.objects.filter(recipe=recipe_id).values(
+                "user"
+            )
+        }
+    else:
+        users = {"user": user_id}
+    totals = CartIngredientTotal.objects.filter(
+        ingredient__in=RecipeIngredients.objects.filter(
+            recipe=recipe_id
+        ).values("ingredient"),
+        **users,
+    )
+    amount = RecipeIngredients.objects.filter(
+        recipe=recipe_id, ingredient=OuterRef("ingredient")
+    ).values("amount")
+    totals.update(amount=Greatest(F("amount") - Subquery(amount), 0))
+    totals.filter(amount=0).delete()
+
+
+def rebuild_totals(user_ids=None):
+    """Пересчет корзин по списку покупок: всех или указанных."""
+    totals, cart, items = quoted_tables()
+    sql = (
+        f"INSERT INTO {totals} (user_id, ingredient_id, amount) "
+        "SELECT cart.user_id, item.ingredient_id, SUM(item.amount) "
+        f"FROM {cart} cart JOIN {items} item "
+        "ON item.recipe_id = cart.recipe_id"
+    )
+    params = []
+    stored = CartIngredientTotal.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        sql += " WHERE cart.user_id IN ({})".format(
+            ", ".join(["%s"] * len(user_ids))
+        )
+        params = user_ids
+        stored = stored.filter(user__in=user_ids)
+    sql += " GROUP BY cart.user_id, item.ingredient_id"
+    stored.delete()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def drifted_users():
+    """Пользователи, чьи корзины расходятся со списком покупок."""
+    actual = (
+        ShoppingList.objects.filter(recipe__ingredients__isnull=False)
+        .values("user", "recipe__ingredients__ingredient")
+        .annotate(amount=Sum("recipe__ingredients__amount"))
+        .values_list("user", "recipe__ingredients__ingredient", "amount")
+        .order_by()
+    )
+    stored = CartIngredientTotal.objects.values_list(
+        "user", "ingredient", "amount"
+    ).order_by()
+    return sorted(
+        {user for user, _, _ in actual.difference(stored)}
+        | {user for user, _, _ in stored.difference(actual)}
+    )
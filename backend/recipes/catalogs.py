@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import CatalogVersion
+
+INGREDIENTS_CATALOG = "ingredients"
+TAGS_CATALOG = "tags"
+
+
+def touch_catalog(name):
+    """Новая версия справочника в текущей транзакции.
+
+    Версия только растет: транзакция, дождавшаяся блокировки строки,
+    могла взять время раньше уже записанного.
+    """
+    now = timezone.now()
+    updated = CatalogVersion.objects.filter(name=name).update(
+        updated_at=Greatest(
+            Value(now), F("updated_at") + timedelta(microseconds=1)
+        )
+    )
+    if not updated:
+        CatalogVersion.objects.get_or_create(
+            name=name, defaults={"updated_at": now}
+        )
+
+
+def get_catalog_version(name):
+    """Время последнего изменения справочника, 0 - не менялся."""
+    updated_at = (
+        CatalogVersion.objects.filter(name=name)
+        .values_list("updated_at", flat=True)
+        .first()
+    )
+    return 0 if updated_at is None else updated_at.timestamp()
@@ -0,0 +1,36 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Subscription, User
+
+from .models import FavouriteRecipe, Recipe, ShoppingList
+
+# Счетчик: модель, поле, считаемая модель и ее ссылка на модель счетчика.
+COUNTERS = (
+    (Recipe, "favorites_count", FavouriteRecipe, "recipe"),
+    (Recipe, "in_carts_count", ShoppingList, "recipe"),
+    (User, "recipes_count", Recipe, "author"),
+    (User, "subscribers_count", Subscription, "author"),
+)
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарное изменение счетчика одним UPDATE без чтения строки."""
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def actual_count(related_model, related_field):
+    """Подзапрос с настоящим числом связанных строк."""
+    return Coalesce(
+        Subquery(
+            related_model.objects.filter(**{related_field: OuterRef("pk")})
+            .order_by()
+            .values(related_field)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.db import connection
+
+from jobs.tasks import background
+from users.models import Subscription
+
+from .models import FeedEntry, Recipe
+
+
+def quoted_tables():
+    quote = connection.ops.quote_name
+    return (
+        quote(FeedEntry._meta.db_table),
+        quote(Subscription._meta.db_table),
+        quote(Recipe._meta.db_table),
+    )
+
+
+@background
+def fan_out_recipe(recipe_id):
+    """Новый рецепт добавляется в ленты подписчиков автора.
+
+    Рецепт автора, у которого подписчиков больше FEED_FANOUT_LIMIT,
+    в ленты не копируется: get_feed читает его из таблицы рецептов.
+    """
+    if Recipe.objects.filter(
+        pk=recipe_id,
+        author__subscribers_count__gt=settings.FEED_FANOUT_LIMIT,
+    ).update(in_feeds=False):
+        return
+    feed, subscriptions, recipes = quoted_tables()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {feed} (user_id, recipe_id, pub_date) "
+            "SELECT subscription.user_id, recipe.id, recipe.pub_date "
+            f"FROM {recipes} recipe JOIN {subscriptions} subscription "
+            "ON subscription.author_id = recipe.author_id "
+            "WHERE recipe.id = %s AND recipe.in_feeds "
+            "ON CONFLICT (user_id, recipe_id) DO NOTHING",
+            [recipe_id],
+        )
+
+
+def add_author_to_feed(user_id, author_id):
+    """Рецепты автора добавляются в ленту нового подписчика."""
+    feed, _, recipes = quoted_tables()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {feed} (user_id, recipe_id, pub_date) "
+            f"SELECT %s, recipe.id, recipe.pub_date FROM {recipes} recipe "
+            "WHERE recipe.author_id = %s AND recipe.in_feeds "
+            "ON CONFLICT (user_id, recipe_id) DO NOTHING",
+            [user_id, author_id],
+        )
+
+
+def remove_author_from_feed(user_id, author_id):
+    """Рецепты автора удаляются из ленты отписавшегося."""
+    FeedEntry.objects.filter(user=user_id, recipe__author=author_id).delete()
+
+
+def before(queryset, position, field):
+    """Строки после position в порядке ленты: (-pub_date, -field)."""
+    pub_date, pk = position
+    # Условие pub_date <= ... ограничивает диапазон индекса, остальное
+    # отсекает уже показанные рецепты с той же датой.
+    return queryset.filter(pub_date__lte=pub_date).exclude(
+        pub_date=pub_date, **{f"{field}__gte": pk}
+    )
+
+
+def get_feed(user, position, limit):
+    """Лента подписок: пары (дата публикации, id рецепта), новые первыми.
+
+    position - пара последнего рецепта предыдущей страницы или None.
+    Разосланные рецепты читаются из лент, рецепты авторов с большим
+    числом подписчиков - из таблицы рецептов; обе выборки идут
+    по индексам, не дальше limit строк, и сливаются.
+    """
+    entries = FeedEntry.objects.filter(user=user)
+    pulled = Recipe.objects.filter(
+        in_feeds=False,
+        author__in=Subscription.objects.filter(user=user).values("author"),
+    )
+    if position is not None:
+        entries = before(entries, position, "recipe")
+        pulled = before(pulled, position, "id")
+    rows = {
+        *entries.order_by("-pub_date", "-recipe_id").values_list(
+            "pub_date", "recipe"
+        )[:limit],
+        *pulled.order_by("-pub_date", "-id").values_list("pub_date", "id")[
+            :limit
+        ],
+    }
+    return sorted(rows, reverse=True)[:limit]
+
+
+def rebuild_feeds(user_ids=None):
+    """Ленты по подпискам заново: все или указанных пользователей."""
+    feed, subscriptions, recipes = quoted_tables()
+    sql = (
+        f"INSERT INTO {feed} (user_id, recipe_id, pub_date) "
+        "SELECT subscription.user_id, recipe.id, recipe.pub_date "
+        f"FROM {subscriptions} subscription JOIN {recipes} recipe "
+        "ON recipe.author_id = subscription.author_id WHERE recipe.in_feeds"
+    )
+    params = []
+    stored = FeedEntry.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        sql += " AND subscription.user_id IN ({})".format(
+            ", ".join(["%s"] * len(user_ids))
+        )
+        params = user_ids
+        stored = stored.filter(user__in=user_ids)
+    stored.delete()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def drifted_feeds():
+    """Пользователи, чьи ленты расходятся с подписками."""
+    actual = (
+        Subscription.objects.filter(author__recipes__in_feeds=True)
+        .values_list("user", "author__recipes")
+        .order_by()
+    )
+    stored = FeedEntry.objects.values_list("user", "recipe").order_by()
+    return sorted(
+        {user for user, _ in actual.difference(stored)}
+        | {user for user, _ in stored.difference(actual)}
+    )
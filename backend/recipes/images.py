@@ -0,0 +1,87 @@
+from hashlib import sha256
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image
+
+from api.cache import RECIPES_VERSION, bump_version
+from jobs.tasks import background
+
+from .models import Recipe
+
+VARIANTS_DIR = "image_recipe/variants"
+VARIANT_FORMATS = {"jpeg": "jpg", "webp": "webp"}
+
+
+def source_digest(image):
+    """Хэш исходного файла, имя загруженного через API уже его содержит."""
+    stem = PurePosixPath(image.name).stem
+    if len(stem) == 64:
+        return stem
+    digest = sha256()
+    with image.open("rb") as file:
+        for chunk in file.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def render_variant(source, width, file_format):
+    image = source.copy()
+    image.thumbnail((width, width * 4))
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        format=file_format,
+        quality=settings.RECIPE_IMAGE_QUALITY,
+        optimize=True,
+    )
+    return buffer.getvalue()
+
+
+@background
+def generate_image_variants(recipe_id):
+    """Уменьшенные копии изображения рецепта в JPEG и WebP."""
+    recipe = Recipe.objects.filter(pk=recipe_id).only("image").first()
+    if recipe is None or not recipe.image:
+        return
+    storage = recipe.image.storage
+    digest = source_digest(recipe.image)
+    variants = {}
+    with recipe.image.open("rb") as file, Image.open(file) as source:
+        source.load()
+        for size, width in settings.RECIPE_IMAGE_SIZES.items():
+            variants[size] = {}
+            for file_format, extension in VARIANT_FORMATS.items():
+                name = f"{VARIANTS_DIR}/{digest}_{width}.{extension}"
+                if not storage.exists(name):
+                    content = render_variant(source, width, file_format)
+                    saved = storage.save(name, ContentFile(content))
+                    if saved != name:
+                        # Ту же копию параллельно сохранила другая задача.
+                        storage.delete(saved)
+                variants[size][file_format] = name
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(image_variants=variants, updated_at=timezone.now())
+    if updated:
+        bump_version(RECIPES_VERSION)
+
+
+def image_variant_urls(recipe):
+    """Ссылки на копии по размерам, до генерации - на оригинал."""
+    if not recipe.image:
+        return {}
+    storage = recipe.image.storage
+    urls = {}
+    for size in settings.RECIPE_IMAGE_SIZES:
+        variant = recipe.image_variants.get(size, {})
+        for file_format in VARIANT_FORMATS:
+            key = size if file_format == "jpeg" else f"{size}_{file_format}"
+            name = variant.get(file_format)
+            urls[key] = storage.url(name) if name else recipe.image.url
+    return urls
@@ -1,22 +1,220 @@
 import csv
+import json
+import time
+from io import StringIO
+from itertools import islice
+from pathlib import Path
 
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
-from recipes.models import Ingredient
+from api.cache import RECIPES_VERSION, bump_version
+from recipes.catalogs import INGREDIENTS_CATALOG, TAGS_CATALOG, touch_catalog
+from recipes.models import Ingredient, Tag
+
+DATA_DIR = Path(settings.BASE_DIR) / "recipes" / "data"
+JSON_CHUNK_SIZE = 64 * 1024
+
+CATALOGS = {
+    INGREDIENTS_CATALOG: {
+        "model": Ingredient,
+        "fields": ("name", "measurement_unit"),
+        "unique_fields": ("name", "measurement_unit"),
+        "update_fields": (),
+        "versions": (),
+    },
+    TAGS_CATALOG: {
+        "model": Tag,
+        "fields": ("name", "color", "slug"),
+        "unique_fields": ("slug",),
+        "update_fields": ("name", "color"),
+        "versions": (RECIPES_VERSION,),
+    },
+}
+
+
+def iter_csv(file):
+    yield from csv.DictReader(file)
+
+
+def iter_json(file):
+    """Потоковое чтение JSON-массива объектов без загрузки файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise CommandError("Ожидается JSON-массив объектов")
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError("Некорректный JSON")
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def detect_format(path, file):
+    if path.suffix.lower() in (".csv", ".json"):
+        return path.suffix.lower()[1:]
+    first_char = file.read(JSON_CHUNK_SIZE).lstrip()[:1]
+    file.seek(0)
+    return "json" if first_char == "[" else "csv"
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def unique_rows(catalog, batch):
+    """Одна строка на уникальный ключ, последняя из повторов.
+
+    Одна команда INSERT ... ON CONFLICT DO UPDATE не может изменить
+    строку дважды, а в файле справочника ключ может повторяться.
+    """
+    fields = catalog["fields"]
+    key = [fields.index(field) for field in catalog["unique_fields"]]
+    return list(
+        {tuple(row[index] for index in key): row for row in batch}.values()
+    )
 
 
 class Command(BaseCommand):
+    help = (
+        "Идемпотентная загрузка справочников ингредиентов и тегов "
+        "из CSV или JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "files",
+            nargs="*",
+            help="Файлы для загрузки, по умолчанию данные из recipes/data",
+        )
+        parser.add_argument(
+            "--catalog",
+            choices=CATALOGS,
+            help="Справочник, по умолчанию определяется по имени файла",
+        )
+        parser.add_argument(
+            "--format", choices=("csv", "json"), dest="file_format"
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--copy",
+            action="store_true",
+            help="Загрузка через COPY во временную таблицу (PostgreSQL)",
+        )
+
     def handle(self, *args, **options):
-        print("Запуск импорта ингредиентов")
-        file_name = "ingredients.csv"
-        model = Ingredient
+        files = options["files"] or [
+            DATA_DIR / "ingredients.csv",
+            DATA_DIR / "tags.json",
+        ]
+        if options["copy"] and connection.vendor != "postgresql":
+            raise CommandError("COPY поддерживается только в PostgreSQL")
+        for file_name in files:
+            path = Path(file_name)
+            catalog = options["catalog"] or path.stem
+            if catalog not in CATALOGS:
+                raise CommandError(
+                    f"Не удалось определить справочник для {path.name}, "
+                    "укажите --catalog"
+                )
+            self.load(path, catalog, options)
+
+    def load(self, path, name, options):
+        self.stdout.write(f"Загрузка {path.name}")
+        catalog = CATALOGS[name]
+        model = catalog["model"]
+        count_before = model.objects.count()
+        start = time.perf_counter()
         try:
-            with open(
-                "recipes/data/ingredients.csv", encoding="utf-8"
-            ) as csvfile:
-                reader = csv.DictReader(csvfile)
-                model.objects.bulk_create(model(**data) for data in reader)
+            with open(path, encoding="utf-8") as file:
+                file_format = options["file_format"] or detect_format(
+                    path, file
+                )
+                reader = iter_csv if file_format == "csv" else iter_json
+                rows = (
+                    tuple(row[field] for field in catalog["fields"])
+                    for row in reader(file)
+                )
+                save = self.copy if options["copy"] else self.bulk_create
+                total = 0
+                with transaction.atomic():
+                    for batch in batches(rows, options["batch_size"]):
+                        save(catalog, unique_rows(catalog, batch))
+                        total += len(batch)
+                    touch_catalog(name)
         except FileNotFoundError:
-            raise CommandError(f"Файл {file_name} не найден")
+            raise CommandError(f"Файл {path} не найден")
+        except KeyError as error:
+            raise CommandError(f"В {path.name} нет поля {error}")
+        elapsed = time.perf_counter() - start
+        for version in catalog["versions"]:
+            bump_version(version)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{path.name}: обработано {total} строк, добавлено "
+                f"{model.objects.count() - count_before} за "
+                f"{elapsed:.2f} с ({total / max(elapsed, 1e-9):.0f} строк/с)"
+            )
+        )
+
+    def bulk_create(self, catalog, batch):
+        model = catalog["model"]
+        objects = [model(**dict(zip(catalog["fields"], row))) for row in batch]
+        if catalog["update_fields"]:
+            model.objects.bulk_create(
+                objects,
+                update_conflicts=True,
+                unique_fields=catalog["unique_fields"],
+                update_fields=catalog["update_fields"],
+            )
+        else:
+            model.objects.bulk_create(objects, ignore_conflicts=True)
+
+    def copy(self, catalog, batch):
+        quote = connection.ops.quote_name
+        table = quote(catalog["model"]._meta.db_table)
+        fields = ", ".join(map(quote, catalog["fields"]))
+        unique_fields = ", ".join(map(quote, catalog["unique_fields"]))
+        if catalog["update_fields"]:
+            on_conflict = "DO UPDATE SET " + ", ".join(
+                f"{quote(field)} = EXCLUDED.{quote(field)}"
+                for field in catalog["update_fields"]
+            )
         else:
-            print("Ингридиенты загружены!")
+            on_conflict = "DO NOTHING"
+        buffer = StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE load_staging ({}) "
+                "ON COMMIT DROP".format(
+                    ", ".join(
+                        f"{quote(field)} text" for field in catalog["fields"]
+                    )
+                )
+            )
+            cursor.copy_expert(
+                f"COPY load_staging ({fields}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+            cursor.execute(
+                f"INSERT INTO {table} ({fields}) "
+                f"SELECT {fields} FROM load_staging "
+                f"ON CONFLICT ({unique_fields}) "
+                f"{on_conflict}"
+            )
+            cursor.execute("DROP TABLE load_staging")
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from recipes.cart import drifted_users, rebuild_totals
+from recipes.counters import COUNTERS, actual_count
+from recipes.feed import drifted_feeds, rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчет счетчиков популярности, сумм ингредиентов в корзинах "
+        "и лент подписок с поиском расхождений"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать расхождения, ничего не исправлять",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, field, related_model, related_field in COUNTERS:
+            actual = actual_count(related_model, related_field)
+            drift = list(
+                model.objects.annotate(actual=actual)
+                .exclude(**{field: F("actual")})
+                .values_list("pk", field, "actual")
+            )
+            total += len(drift)
+            title = f"{model._meta.label}.{field}"
+            if not drift:
+                self.stdout.write(f"{title}: расхождений нет")
+                continue
+            self.stdout.write(
+                self.style.WARNING(f"{title}: расхождений {len(drift)}")
+            )
+            for pk, stored, real in drift[:10]:
+                self.stdout.write(f"  id={pk}: {stored} вместо {real}")
+            if options["dry_run"]:
+                continue
+            pks = [pk for pk, _, _ in drift]
+            size = options["batch_size"]
+            for start in range(0, len(pks), size):
+                end = start + size
+                with transaction.atomic():
+                    model.objects.filter(pk__in=pks[start:end]).update(
+                        **{field: actual}
+                    )
+        total += self.rebuild(
+            "Корзины", drifted_users(), rebuild_totals, options
+        )
+        total += self.rebuild("Ленты", drifted_feeds(), rebuild_feeds, options)
+        if total and not options["dry_run"]:
+            self.stdout.write(
+                self.style.SUCCESS(f"Исправлено счетчиков: {total}")
+            )
+
+    def rebuild(self, title, users, rebuild_users, options):
+        if not users:
+            self.stdout.write(f"{title}: расхождений нет")
+            return 0
+        self.stdout.write(
+            self.style.WARNING(f"{title}: расхождений {len(users)}")
+        )
+        self.stdout.write(f"  пользователи: {users[:10]}")
+        if not options["dry_run"]:
+            size = options["batch_size"]
+            for start in range(0, len(users), size):
+                end = start + size
+                with transaction.atomic():
+                    rebuild_users(users[start:end])
+        return len(users)
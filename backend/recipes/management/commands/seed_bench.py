@@ -0,0 +1,257 @@
+import random
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from api.cache import RECIPES_VERSION, bump_version
+from recipes.models import (
+    FavouriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredients,
+    ShoppingList,
+    Tag,
+)
+from recipes.search import update_search_vectors
+from users.models import Subscription, User
+
+USERNAME_PREFIX = "bench_"
+IMAGE_NAME = "image_recipe/bench.jpg"
+LETTERS = "абвгдеежзиклмнопрстуфхцчшэюя"
+WORDS = (
+    "суп",
+    "салат",
+    "пирог",
+    "каша",
+    "рагу",
+    "омлет",
+    "запеканка",
+    "паста",
+    "котлеты",
+    "блины",
+)
+
+
+def zipf_weights(count, exponent=1.0):
+    """Веса популярности: первые элементы выбираются намного чаще."""
+    return [1 / (rank + 1) ** exponent for rank in range(count)]
+
+
+def sample(rng, population, weights, count):
+    """Выборка без повторов с учетом весов."""
+    count = min(count, len(population))
+    chosen = set()
+    while len(chosen) < count:
+        chosen.update(rng.choices(population, weights, k=count - len(chosen)))
+    return chosen
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерация синтетических пользователей, рецептов, избранного, "
+        "списков покупок и подписок для нагрузочных тестов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=10000)
+        parser.add_argument(
+            "--favorites",
+            type=int,
+            default=20,
+            help="Среднее число избранных рецептов у пользователя",
+        )
+        parser.add_argument(
+            "--carts",
+            type=int,
+            default=5,
+            help="Среднее число рецептов в списке покупок",
+        )
+        parser.add_argument(
+            "--subscriptions",
+            type=int,
+            default=10,
+            help="Среднее число подписок у пользователя",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Удалить ранее сгенерированные данные",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        if options["clear"]:
+            deleted, _ = User.objects.filter(
+                username__startswith=USERNAME_PREFIX
+            ).delete()
+            self.stdout.write(f"Удалено объектов: {deleted}")
+        ingredients = list(Ingredient.objects.values_list("id", flat=True))
+        tags = list(Tag.objects.values_list("id", flat=True))
+        if not ingredients or not tags:
+            raise CommandError(
+                "Нет ингредиентов или тегов, выполните manage.py load"
+            )
+        self.rng.shuffle(ingredients)
+        start = time.perf_counter()
+        with transaction.atomic():
+            users = self.create_users(options["users"])
+            recipes = self.create_recipes(
+                users, ingredients, tags, options["recipes"]
+            )
+            self.create_relations(users, recipes, options)
+        # bulk_create не вызывает сигналы, счетчики и поисковые векторы
+        # заполняются отдельно.
+        call_command("recount", stdout=StringIO())
+        recipe_ids = [recipe.pk for recipe in recipes]
+        for offset in range(0, len(recipe_ids), self.batch_size):
+            end = offset + self.batch_size
+            update_search_vectors(recipe_ids[offset:end])
+        bump_version(RECIPES_VERSION)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Готово за {time.perf_counter() - start:.1f} с"
+            )
+        )
+
+    def bulk(self, model, objects, **kwargs):
+        created = model.objects.bulk_create(
+            objects, batch_size=self.batch_size, **kwargs
+        )
+        self.stdout.write(f"{model._meta.verbose_name_plural}: {len(objects)}")
+        return created
+
+    def word(self, length):
+        return "".join(self.rng.choices(LETTERS, k=length)).capitalize()
+
+    def create_users(self, count):
+        first = User.objects.filter(
+            username__startswith=USERNAME_PREFIX
+        ).count()
+        password = make_password("bench-password")
+        return self.bulk(
+            User,
+            [
+                User(
+                    username=f"{USERNAME_PREFIX}{number}",
+                    email=f"{USERNAME_PREFIX}{number}@example.com",
+                    first_name=self.word(6),
+                    last_name=self.word(8),
+                    password=password,
+                )
+                for number in range(first, first + count)
+            ],
+        )
+
+    def create_recipes(self, users, ingredients, tags, count):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = BytesIO()
+            Image.new("RGB", (640, 480), "#E26C2D").save(buffer, "JPEG")
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        # Немногие авторы публикуют большую часть рецептов.
+        authors = self.rng.choices(
+            users, zipf_weights(len(users), 0.8), k=count
+        )
+        now = timezone.now()
+        recipes = self.bulk(
+            Recipe,
+            [
+                Recipe(
+                    author=author,
+                    name=(
+                        f"{self.rng.choice(WORDS).capitalize()} "
+                        f"{self.word(7).lower()}"
+                    ),
+                    text=" ".join(self.word(6) for _ in range(40)),
+                    cooking_time=self.rng.randint(5, 180),
+                    image=IMAGE_NAME,
+                )
+                for author in authors
+            ],
+        )
+        for recipe in recipes:
+            recipe.pub_date = now - timedelta(
+                minutes=self.rng.randint(0, 365 * 24 * 60)
+            )
+        Recipe.objects.bulk_update(
+            recipes, ("pub_date",), batch_size=self.batch_size
+        )
+        ingredient_weights = zipf_weights(len(ingredients))
+        self.bulk(
+            RecipeIngredients,
+            [
+                RecipeIngredients(
+                    recipe=recipe,
+                    ingredient_id=ingredient,
+                    amount=self.rng.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient in sample(
+                    self.rng,
+                    ingredients,
+                    ingredient_weights,
+                    round(self.rng.triangular(2, 15, 6)),
+                )
+            ],
+        )
+        tag_weights = zipf_weights(len(tags), 0.5)
+        self.bulk(
+            Recipe.tags.through,
+            [
+                Recipe.tags.through(recipe=recipe, tag_id=tag)
+                for recipe in recipes
+                for tag in sample(
+                    self.rng, tags, tag_weights, self.rng.randint(1, 3)
+                )
+            ],
+        )
+        return recipes
+
+    def create_relations(self, users, recipes, options):
+        recipe_weights = zipf_weights(len(recipes), 0.7)
+        author_weights = zipf_weights(len(users), 0.8)
+        for model, average in (
+            (FavouriteRecipe, options["favorites"]),
+            (ShoppingList, options["carts"]),
+        ):
+            self.bulk(
+                model,
+                [
+                    model(user=user, recipe=recipe)
+                    for user in users
+                    for recipe in sample(
+                        self.rng,
+                        recipes,
+                        recipe_weights,
+                        round(self.rng.expovariate(1 / average)),
+                    )
+                ],
+                ignore_conflicts=True,
+            )
+        self.bulk(
+            Subscription,
+            [
+                Subscription(user=user, author=author)
+                for user in users
+                for author in sample(
+                    self.rng,
+                    users,
+                    author_weights,
+                    round(self.rng.expovariate(1 / options["subscriptions"])),
+                )
+                if author != user
+            ],
+            ignore_conflicts=True,
+        )
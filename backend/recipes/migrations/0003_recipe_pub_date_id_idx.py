@@ -0,0 +1,148 @@
+# Generated by Django 4.2.3 on 2026-10-18 04:39
+
+import api.validators
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ingredient',
+            options={
+                'verbose_name': 'ингредиент',
+                'verbose_name_plural': 'ингредиенты',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='recipeingredients',
+            options={
+                'verbose_name': 'Ингредиент для рецепта',
+                'verbose_name_plural': 'Ингредиенты для рецепта',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='shoppinglist',
+            options={
+                'ordering': ('-id',),
+                'verbose_name': 'Список покупок',
+                'verbose_name_plural': 'Корзина для продуктов',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='tag',
+            options={'verbose_name': 'Тег', 'verbose_name_plural': 'Теги'},
+        ),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='ingredients',
+        ),
+        migrations.AlterField(
+            model_name='favouriterecipe',
+            name='recipe',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='+',
+                to='recipes.recipe',
+                verbose_name='Рецепт',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='name',
+            field=models.CharField(
+                max_length=200,
+                validators=[api.validators.validate_name],
+                verbose_name='Название ингредиента',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(
+                upload_to='image_recipe/', verbose_name='Изображение рецепта'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='name',
+            field=models.CharField(
+                max_length=200,
+                validators=[api.validators.validate_name],
+                verbose_name='Название рецепта',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='recipeingredients',
+            name='ingredient',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='+',
+                to='recipes.ingredient',
+                verbose_name='Ингредиент',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='recipeingredients',
+            name='recipe',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='ingredients',
+                to='recipes.recipe',
+                verbose_name='Рецепт',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='shoppinglist',
+            name='recipe',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='+',
+                to='recipes.recipe',
+                verbose_name='Рецепт',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='color',
+            field=models.CharField(
+                max_length=7,
+                unique=True,
+                validators=[
+                    django.core.validators.RegexValidator(
+                        '#([a-fA-F0-9]{3,6})',
+                        message='Поле только для HEX формата данных',
+                    )
+                ],
+                verbose_name='Цвет тега в формате HEX',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='name',
+            field=models.CharField(
+                max_length=200,
+                unique=True,
+                validators=[api.validators.validate_name],
+                verbose_name='Название тега',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['-pub_date', 'id'], name='recipe_pub_date_id_idx'
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_name_measurement_unit',
+            ),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.3 on 2026-10-18 05:00
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+PATTERN_INDEXES = (
+    (
+        'ingredient_name_pattern_idx',
+        'recipes_ingredient (name varchar_pattern_ops)',
+    ),
+    (
+        'ingredient_upper_name_pattern_idx',
+        'recipes_ingredient (UPPER(name) varchar_pattern_ops)',
+    ),
+)
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Повторы ингредиента в рецепте сливаются в одну строку."""
+    RecipeIngredients = apps.get_model('recipes', 'RecipeIngredients')
+    duplicates = (
+        RecipeIngredients.objects.values('recipe', 'ingredient')
+        .annotate(count=Count('id'), keep=Min('id'), total=Sum('amount'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for duplicate in duplicates:
+        RecipeIngredients.objects.filter(
+            recipe=duplicate['recipe'], ingredient=duplicate['ingredient']
+        ).exclude(id=duplicate['keep']).delete()
+        RecipeIngredients.objects.filter(id=duplicate['keep']).update(
+            amount=min(duplicate['total'], 32767)
+        )
+
+
+def create_pattern_indexes(apps, schema_editor):
+    """Индексы для LIKE 'префикс%' есть только в PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, definition in PATTERN_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {definition}'
+        )
+
+
+def drop_pattern_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in PATTERN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0006_popularity_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx',
+            ),
+        ),
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredients',
+            constraint=models.UniqueConstraint(
+                fields=('recipe', 'ingredient'),
+                name='unique_recipe_ingredient',
+            ),
+        ),
+        migrations.RunPython(create_pattern_indexes, drop_pattern_indexes),
+    ]
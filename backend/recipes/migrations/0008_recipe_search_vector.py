@@ -0,0 +1,86 @@
+# Generated by Django 4.2.3 on 2026-10-18 05:03
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 10000
+
+FILL_SEARCH_VECTORS = '''
+UPDATE recipes_recipe AS recipe SET search_vector =
+    setweight(to_tsvector(%(config)s::regconfig, recipe.name), 'A')
+    || setweight(to_tsvector(%(config)s::regconfig, COALESCE((
+        SELECT string_agg(ingredient.name, ' ')
+        FROM recipes_recipeingredients AS link
+        JOIN recipes_ingredient AS ingredient
+            ON ingredient.id = link.ingredient_id
+        WHERE link.recipe_id = recipe.id
+    ), '')), 'B')
+    || setweight(to_tsvector(%(config)s::regconfig, recipe.text), 'C')
+WHERE recipe.id >= %(start)s AND recipe.id < %(end)s
+'''
+
+
+def create_search_indexes(apps, schema_editor):
+    """GIN-индексы есть только в PostgreSQL, pg_trgm - если доступен."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+        'ON recipes_recipe USING gin (search_vector)'
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipe_name_trgm_idx '
+        'ON recipes_recipe USING gin (name gin_trgm_ops)'
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS recipe_search_vector_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS recipe_name_trgm_idx')
+
+
+def fill_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    last = Recipe.objects.order_by('-id').values_list('id', flat=True)
+    if not last:
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for start in range(0, last[0] + 1, BATCH_SIZE):
+            cursor.execute(
+                FILL_SEARCH_VECTORS,
+                {
+                    'config': settings.RECIPE_SEARCH_CONFIG,
+                    'start': start,
+                    'end': start + BATCH_SIZE,
+                },
+            )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0007_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name='Поисковый вектор'
+            ),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 4.2.3 on 2026-10-18 05:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+FILL_FEEDS = '''
+INSERT INTO recipes_feedentry (user_id, recipe_id, pub_date)
+SELECT subscription.user_id, recipe.id, recipe.pub_date
+FROM users_subscription AS subscription
+JOIN recipes_recipe AS recipe ON recipe.author_id = subscription.author_id
+'''
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0009_cart_ingredient_total'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'pub_date',
+                    models.DateTimeField(verbose_name='Дата публикации'),
+                ),
+            ],
+            options={
+                'verbose_name': 'Рецепт в ленте',
+                'verbose_name_plural': 'Ленты подписок',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_feeds',
+            field=models.BooleanField(
+                default=True,
+                editable=False,
+                help_text='Рецепты авторов с большим числом подписчиков не копируются в ленты, а читаются из таблицы рецептов',
+                verbose_name='Разослан в ленты подписчиков',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(
+                condition=models.Q(('in_feeds', False)),
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_not_in_feeds_idx',
+            ),
+        ),
+        migrations.AddField(
+            model_name='feedentry',
+            name='recipe',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='+',
+                to='recipes.recipe',
+                verbose_name='Рецепт',
+            ),
+        ),
+        migrations.AddField(
+            model_name='feedentry',
+            name='user',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='+',
+                to=settings.AUTH_USER_MODEL,
+                verbose_name='Подписчик',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx',
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(
+                fields=('user', 'recipe'), name='unique_feed_entry'
+            ),
+        ),
+        migrations.RunSQL(FILL_FEEDS, migrations.RunSQL.noop),
+    ]
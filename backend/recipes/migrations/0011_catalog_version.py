@@ -0,0 +1,46 @@
+# Generated by Django 4.2.3 on 2026-10-18 06:08
+
+from django.db import migrations, models
+from django.utils import timezone
+
+CATALOGS = ('ingredients', 'tags')
+
+
+def create_versions(apps, schema_editor):
+    CatalogVersion = apps.get_model('recipes', 'CatalogVersion')
+    now = timezone.now()
+    CatalogVersion.objects.bulk_create(
+        CatalogVersion(name=name, updated_at=now) for name in CATALOGS
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('recipes', '0010_feed_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                (
+                    'name',
+                    models.CharField(
+                        max_length=32,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='Справочник',
+                    ),
+                ),
+                (
+                    'updated_at',
+                    models.DateTimeField(verbose_name='Время изменения'),
+                ),
+            ],
+            options={
+                'verbose_name': 'Версия справочника',
+                'verbose_name_plural': 'Версии справочников',
+            },
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
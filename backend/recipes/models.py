@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
 
@@ -69,6 +70,23 @@ class Ingredient(models.Model):
         return f"{self.name}"
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Кверисет рецептов с подгрузкой связанных данных."""
+
+    def with_related(self):
+        """Автор, теги и ингредиенты рецептов фиксированным числом
+        запросов."""
+        return self.select_related("author").prefetch_related(
+            "tags",
+            models.Prefetch(
+                "ingredients",
+                queryset=RecipeIngredients.objects.select_related(
+                    "ingredient"
+                ),
+            ),
+        )
+
+
 class Recipe(models.Model):
     """Модель рецептов."""
 
@@ -89,6 +107,12 @@ class Recipe(models.Model):
         blank=False,
         upload_to="image_recipe/",
     )
+    image_variants = models.JSONField(
+        verbose_name="Уменьшенные копии изображения",
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     name = models.CharField(
         verbose_name="Название рецепта",
         max_length=settings.MAX_CHAR_LENGTH,
@@ -111,18 +135,58 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         verbose_name="Дата публикации", auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name="Дата изменения", auto_now=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name="Количество добавлений в избранное",
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name="Количество добавлений в список покупок",
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name="Поисковый вектор",
+        null=True,
+        editable=False,
+    )
+    in_feeds = models.BooleanField(
+        verbose_name="Разослан в ленты подписчиков",
+        default=True,
+        editable=False,
+        help_text=(
+            "Рецепты авторов с большим числом подписчиков не копируются "
+            "в ленты, а читаются из таблицы рецептов"
+        ),
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-pub_date",)
+        indexes = (
+            models.Index(
+                fields=("-pub_date", "id"), name="recipe_pub_date_id_idx"
+            ),
+            models.Index(
+                fields=("author", "-pub_date"),
+                name="recipe_author_pub_date_idx",
+            ),
+            models.Index(
+                fields=("author", "-pub_date", "-id"),
+                condition=models.Q(in_feeds=False),
+                name="recipe_not_in_feeds_idx",
+            ),
+        )
 
     def __str__(self):
         return f"{self.name}"
 
-    def favorites_count(self):
-        return FavouriteRecipe.objects.filter(recipe=self).count()
-
 
 class RecipeIngredients(models.Model):
     """Модель ингредиентов в рецепте."""
@@ -152,6 +216,12 @@ class RecipeIngredients(models.Model):
     class Meta:
         verbose_name = "Ингредиент для рецепта"
         verbose_name_plural = "Ингредиенты для рецепта"
+        constraints = (
+            models.UniqueConstraint(
+                fields=("recipe", "ingredient"),
+                name="unique_recipe_ingredient",
+            ),
+        )
 
     def __str__(self):
         return (
@@ -215,3 +285,98 @@ class ShoppingList(models.Model):
                 fields=("user", "recipe"), name="unique_list_user"
             )
         ]
+
+
+class CartIngredientTotal(models.Model):
+    """Суммарное количество ингредиента в корзине пользователя.
+
+    Обновляется вместе со списком покупок и ингредиентами рецептов,
+    см. recipes.cart.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Ингредиент",
+    )
+    amount = models.PositiveIntegerField(verbose_name="Количество")
+
+    class Meta:
+        verbose_name = "Ингредиент в корзине"
+        verbose_name_plural = "Ингредиенты в корзинах"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "ingredient"), name="unique_cart_ingredient"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.ingredient}: {self.amount}"
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписчика его автора.
+
+    Заполняется при публикации рецепта и подписке, см. recipes.feed.
+    Дата публикации копируется из рецепта для постраничного чтения
+    ленты по индексу.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Подписчик",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Рецепт",
+    )
+    pub_date = models.DateTimeField(verbose_name="Дата публикации")
+
+    class Meta:
+        verbose_name = "Рецепт в ленте"
+        verbose_name_plural = "Ленты подписок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_feed_entry"
+            )
+        ]
+        indexes = (
+            models.Index(
+                fields=("user", "-pub_date", "-recipe"),
+                name="feed_user_pub_date_idx",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.user} - {self.recipe}"
+
+
+class CatalogVersion(models.Model):
+    """Время последнего изменения справочника (тегов, ингредиентов).
+
+    Меняется в транзакции самого изменения, см. recipes.catalogs:
+    все процессы видят новую версию вместе с новыми данными.
+    """
+
+    name = models.CharField(
+        verbose_name="Справочник", max_length=32, primary_key=True
+    )
+    updated_at = models.DateTimeField(verbose_name="Время изменения")
+
+    class Meta:
+        verbose_name = "Версия справочника"
+        verbose_name_plural = "Версии справочников"
+
+    def __str__(self):
+        return f"{self.name}: {self.updated_at}"
@@ -0,0 +1,156 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity,
+)
+from django.db import connection
+from django.db.models import (
+    Case,
+    Exists,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    TextField,
+    Value,
+    When,
+)
+from django.db.backends.signals import connection_created
+from django.db.models.functions import Coalesce, Lower
+from django.db.models.lookups import Contains
+from django.dispatch import receiver
+
+from jobs.tasks import background
+
+from .models import Recipe, RecipeIngredients
+
+
+class UnicodeLower(Lower):
+    """LOWER, в SQLite - через Python: встроенный меняет только ASCII."""
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, function="UNICODE_LOWER", **extra_context
+        )
+
+
+@receiver(connection_created)
+def register_unicode_lower(connection, **kwargs):
+    if connection.vendor == "sqlite":
+        connection.connection.create_function(
+            "UNICODE_LOWER",
+            1,
+            lambda value: None if value is None else value.lower(),
+            deterministic=True,
+        )
+
+
+def search_vector():
+    """Название - вес A, названия ингредиентов - B, описание - C."""
+    config = settings.RECIPE_SEARCH_CONFIG
+    ingredient_names = Subquery(
+        RecipeIngredients.objects.filter(recipe=OuterRef("pk"))
+        .order_by()
+        .values("recipe")
+        .annotate(names=StringAgg("ingredient__name", " "))
+        .values("names")
+    )
+    return (
+        SearchVector("name", weight="A", config=config)
+        + SearchVector(
+            Coalesce(ingredient_names, Value(""), output_field=TextField()),
+            weight="B",
+            config=config,
+        )
+        + SearchVector("text", weight="C", config=config)
+    )
+
+
+def update_search_vectors(recipe_ids):
+    """Пересчет поискового вектора одним UPDATE, только в PostgreSQL."""
+    if connection.vendor != "postgresql":
+        return
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        search_vector=search_vector()
+    )
+
+
+@background
+def update_ingredient_search_vectors(ingredient_id, batch_size=1000):
+    """После переименования ингредиента пересчитываются его рецепты."""
+    recipe_ids = list(
+        RecipeIngredients.objects.filter(ingredient=ingredient_id)
+        .order_by("recipe")
+        .values_list("recipe", flat=True)
+    )
+    for start in range(0, len(recipe_ids), batch_size):
+        end = start + batch_size
+        update_search_vectors(recipe_ids[start:end])
+
+
+@lru_cache
+def trigram_available():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def rank_matches(queryset, condition, **ranks):
+    """Все совпадения по релевантности, при равной - новые первыми.
+
+    Совпадения отбираются по GIN-индексу, а страница с LIMIT дает
+    PostgreSQL отсортировать их top-N без полной сортировки.
+    """
+    ordering = (*Recipe._meta.ordering, "id")
+    return (
+        queryset.filter(condition)
+        .annotate(**ranks)
+        .order_by(*(f"-{name}" for name in ranks), *ordering)
+    )
+
+
+def search_recipes(queryset, text):
+    """Рецепты по релевантности, сначала самые подходящие."""
+    if connection.vendor != "postgresql":
+        return search_recipes_fallback(queryset, text)
+    query = SearchQuery(
+        text, config=settings.RECIPE_SEARCH_CONFIG, search_type="websearch"
+    )
+    condition = Q(search_vector=query)
+    ranks = {"rank": SearchRank(F("search_vector"), query)}
+    if trigram_available():
+        # Опечатки: похожее по триграммам слово в названии рецепта.
+        condition |= Q(name__trigram_word_similar=text)
+        ranks["similarity"] = TrigramWordSimilarity(text, "name")
+    return rank_matches(queryset, condition, **ranks)
+
+
+def search_recipes_fallback(queryset, text):
+    """Поиск подстроки для SQLite, веса полей как у поискового вектора."""
+    text = text.lower()
+
+    def contains(field):
+        return Contains(UnicodeLower(field), text)
+
+    in_ingredients = Exists(
+        RecipeIngredients.objects.filter(
+            contains("ingredient__name"), recipe=OuterRef("pk")
+        )
+    )
+    in_name = Q(contains("name"))
+    return rank_matches(
+        queryset,
+        in_name | Q(in_ingredients) | Q(contains("text")),
+        rank=Case(
+            When(in_name, then=3),
+            When(in_ingredients, then=2),
+            default=1,
+            output_field=IntegerField(),
+        ),
+    )
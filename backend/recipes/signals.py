@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from api.cache import RECIPES_VERSION, bump_version
+from users.models import Subscription, User
+
+from .cart import add_recipe_to_totals, subtract_recipe_from_totals
+from .catalogs import INGREDIENTS_CATALOG, TAGS_CATALOG, touch_catalog
+from .counters import COUNTERS, change_counter
+from .feed import add_author_to_feed, fan_out_recipe, remove_author_from_feed
+from .images import generate_image_variants
+from .models import (
+    FavouriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredients,
+    ShoppingList,
+    Tag,
+)
+from .search import update_ingredient_search_vectors, update_search_vectors
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(**kwargs):
+    touch_catalog(INGREDIENTS_CATALOG)
+
+
+# Поля пользователя в ответах с рецептами его авторства.
+AUTHOR_FIELDS = frozenset(("username", "first_name", "last_name", "email"))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredients)
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver(post_delete, sender=User)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipes_changed(**kwargs):
+    # До фиксации другие запросы видят старые данные и снова
+    # закэшировали бы их под новой версией.
+    transaction.on_commit(lambda: bump_version(RECIPES_VERSION))
+
+
+@receiver(post_save, sender=User)
+def author_saved(created, update_fields, **kwargs):
+    # Новый пользователь еще не автор, вход меняет только last_login.
+    if not created and (
+        update_fields is None or AUTHOR_FIELDS.intersection(update_fields)
+    ):
+        recipes_changed()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(**kwargs):
+    touch_catalog(TAGS_CATALOG)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(instance, **kwargs):
+    if instance.image and not instance.image_variants:
+        generate_image_variants.delay(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_saved(instance, **kwargs):
+    # Ингредиенты сохраняются после рецепта, вектор считается при коммите.
+    transaction.on_commit(lambda: update_search_vectors([instance.pk]))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_search_saved(instance, created, **kwargs):
+    if not created:
+        update_ingredient_search_vectors.delay(instance.pk)
+
+
+@receiver(post_save, sender=FavouriteRecipe)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscription)
+def counted_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(sender, instance, 1)
+
+
+@receiver(post_delete, sender=FavouriteRecipe)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscription)
+def counted_deleted(sender, instance, **kwargs):
+    update_counter(sender, instance, -1)
+
+
+@receiver(post_save, sender=ShoppingList)
+def cart_item_saved(instance, created, **kwargs):
+    if created:
+        add_recipe_to_totals(instance.recipe_id, instance.user_id)
+
+
+@receiver(pre_delete, sender=ShoppingList)
+def cart_item_deleted(instance, **kwargs):
+    # До удаления: вместе с рецептом каскадом удаляются и его ингредиенты.
+    subtract_recipe_from_totals(instance.recipe_id, instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_feed_saved(instance, created, **kwargs):
+    if created:
+        fan_out_recipe.delay(instance.pk)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_saved(instance, created, **kwargs):
+    if created:
+        add_author_to_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(instance, **kwargs):
+    remove_author_from_feed(instance.user_id, instance.author_id)
+
+
+def update_counter(sender, instance, delta):
+    """Счетчики меняются в той же транзакции, что и сама связь."""
+    for model, field, related_model, related_field in COUNTERS:
+        if related_model is sender:
+            pk = getattr(instance, f"{related_field}_id")
+            change_counter(model, pk, field, delta)
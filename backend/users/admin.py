@@ -1,13 +1,32 @@
 from django.contrib import admin
 
+from api.admin_utils import AuthorFilter, ScalableAdminMixin, UserFilter
+
 from .models import Subscription, User
 
-admin.site.register(User)
+
+@admin.register(User)
+class UserInAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    """Модель пользователей для отображения в админке"""
+
+    list_display = (
+        "id",
+        "username",
+        "email",
+        "first_name",
+        "last_name",
+        "recipes_count",
+        "subscribers_count",
+    )
+    search_fields = ("username", "email")
 
 
 @admin.register(Subscription)
-class SubscriptionInAdmin(admin.ModelAdmin):
+class SubscriptionInAdmin(ScalableAdminMixin, admin.ModelAdmin):
     """Модель подписок для отображения в админке"""
 
     list_display = ("id", "user", "author")
-    search_fields = ("user",)
+    list_select_related = ("user", "author")
+    search_fields = ("user__username", "author__username")
+    list_filter = (UserFilter, AuthorFilter)
+    autocomplete_fields = ("user", "author")
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.3 on 2026-10-18 04:52
+
+import api.validators
+import django.contrib.auth.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='subscription',
+            options={
+                'verbose_name': 'Подписки',
+                'verbose_name_plural': 'Подписчики',
+            },
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='Количество рецептов'
+            ),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='subscribers_count',
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name='Количество подписчиков',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='first_name',
+            field=models.CharField(
+                max_length=150,
+                validators=[api.validators.validate_name],
+                verbose_name='Имя',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='last_name',
+            field=models.CharField(
+                max_length=150,
+                validators=[api.validators.validate_name],
+                verbose_name='Фамилия',
+            ),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='password',
+            field=models.CharField(max_length=128, verbose_name='password'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='username',
+            field=models.CharField(
+                max_length=150,
+                unique=True,
+                validators=[
+                    api.validators.validate_username,
+                    django.contrib.auth.validators.UnicodeUsernameValidator(),
+                ],
+                verbose_name='Имя пользователя',
+            ),
+        ),
+    ]